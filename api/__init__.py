@@ -0,0 +1 @@
+"""API locale en lecture seule exposant les indicateurs du tableau de bord."""
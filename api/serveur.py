@@ -0,0 +1,351 @@
+"""
+API HTTP locale, en lecture seule, pour les indicateurs territoriaux.
+
+Les réponses réutilisent les chargeurs et agrégations des pages
+(`donnees.stockage`, `donnees.requetes`, `pathologies.standardisation`) et
+sont servies depuis un cache LRU en mémoire. L'ETag dépend de la version des
+données : un client qui renvoie `If-None-Match` reçoit un 304 sans corps tant
+que les fichiers n'ont pas changé.
+
+Routes (paramètre `region`, code INSEE, 76 par défaut) :
+    GET /etablissements            personnes par établissement
+    GET /etablissements/typologie  nombre d'établissements par type (filtre optionnel epci_nom)
+    GET /distances?par=dep_nom     distance moyenne aux urgences (dep_nom, grille_densite_texte)
+    GET /pathologies?annee=2023    prévalences brutes et standardisées par département
+    GET /etablissements/autour?lat=43.6&lon=1.44&rayon_km=20
+                                   nombre d'établissements par type dans un rayon
+    GET /etablissements/emprise?bbox=lat_min,lon_min,lat_max,lon_max
+                                   établissements visibles dans une vue de carte
+
+Format : JSON par défaut, Arrow (flux IPC) avec `?format=arrow` ou
+`Accept: application/vnd.apache.arrow.stream`.
+
+Extraction d'un jeu complet, diffusée par blocs (`Transfer-Encoding: chunked`) :
+    GET /export?jeu=etablissements&region=76,75&format=parquet
+
+Usage :
+    python -m api.serveur --port 8502
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import chain
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from donnees.export import FORMATS, iter_export
+from donnees.requetes import distance_moyenne_par, typologie
+from donnees.stockage import SOURCES, charger, version_sources
+from donnees.territoires import REGION_DEFAUT, REGIONS, code_departement
+from etablissement.spatial import IndexSpatial, comptes_par_type
+from pathologies.standardisation import construire_tenseur, population_reference, taux_standardises
+
+
+TYPE_JSON = "application/json; charset=utf-8"
+TYPE_ARROW = "application/vnd.apache.arrow.stream"
+FORMATS_REPONSE = ("json", "arrow")
+
+TAILLE_CACHE = 512
+DUREE_VERSION = 2.0  # secondes entre deux relevés de la version des fichiers
+
+COLONNES_DISTANCE = ("dep_nom", "grille_densite_texte", "epci_nom", "canton_nom")
+
+
+class ErreurRequete(Exception):
+    """Paramètre invalide : renvoyé au client en 400."""
+
+
+# ─── VERSION DES DONNÉES ─────────────────────────────────────────
+_version = {"valeur": None, "releve": 0.0}
+_verrou_version = threading.Lock()
+
+
+def version_donnees():
+    """Version des fichiers sources, relevée au plus toutes les DUREE_VERSION secondes."""
+    with _verrou_version:
+        maintenant = time.monotonic()
+        if _version["valeur"] is None or maintenant - _version["releve"] > DUREE_VERSION:
+            _version["valeur"] = version_sources()
+            _version["releve"] = maintenant
+        return _version["valeur"]
+
+
+# ─── INDICATEURS ─────────────────────────────────────────────────
+def _region(params):
+    region = params.get("region", REGION_DEFAUT)
+    if region not in REGIONS:
+        raise ErreurRequete(f"région inconnue : {region}")
+    return region
+
+
+def personnes_par_etablissement(params):
+    region = _region(params)
+    etabs = charger("etablissements", regions=[region], colonnes=["numero finess etablissement"])
+    communes = charger("communes", regions=[region], colonnes=["population"])
+    total = etabs["numero finess etablissement"].nunique()
+    population = int(communes["population"].sum())
+    return pd.DataFrame([{
+        "region": region,
+        "nom_region": REGIONS[region],
+        "total_etabs": total,
+        "population": population,
+        "personnes_par_etablissement": round(population / total, 1) if total else None,
+    }])
+
+
+def typologie_etablissements(params):
+    region = _region(params)
+    if "epci_nom" in params:
+        # Seul le jeu joint aux communes porte l'EPCI de chaque établissement
+        return typologie("etablissements_communes", regions=[region], epci_nom=params["epci_nom"])
+    return typologie(regions=[region])
+
+
+def distances(params):
+    par = params.get("par", "dep_nom")
+    if par not in COLONNES_DISTANCE:
+        raise ErreurRequete(f"par doit valoir l'une de : {', '.join(COLONNES_DISTANCE)}")
+    return distance_moyenne_par(par, regions=[_region(params)])
+
+
+@lru_cache(maxsize=32)
+def _etablissements(region, version):
+    etabs = charger("etablissements", regions=[region], colonnes=[
+        "numero finess etablissement", "raison_sociale", "type d etablissements", "latitude", "longitude",
+    ]).reset_index(drop=True)
+    return etabs, IndexSpatial.construire(etabs)
+
+
+def _flottants(params, *noms):
+    try:
+        return [float(params[n]) for n in noms]
+    except KeyError as e:
+        raise ErreurRequete(f"paramètre manquant : {e.args[0]}")
+    except ValueError:
+        raise ErreurRequete(f"{', '.join(noms)} doivent être des nombres")
+
+
+def autour(params):
+    etabs, index = _etablissements(_region(params), version_donnees())
+    lat, lon, rayon = _flottants({"rayon_km": 20, **params}, "lat", "lon", "rayon_km")
+    positions, _ = index.dans_rayon(lat, lon, rayon)
+    return comptes_par_type(etabs, positions)
+
+
+def emprise(params):
+    etabs, index = _etablissements(_region(params), version_donnees())
+    try:
+        lat_min, lon_min, lat_max, lon_max = map(float, params["bbox"].split(","))
+    except (KeyError, ValueError):
+        raise ErreurRequete("bbox attendu : lat_min,lon_min,lat_max,lon_max")
+    return etabs.iloc[index.dans_emprise(lat_min, lat_max, lon_min, lon_max)] \
+                .drop_duplicates("numero finess etablissement")
+
+
+@lru_cache(maxsize=32)
+def _tenseur(region, version):
+    # Codes départementaux officiels en texte ('09', '2A') à la place des codes numériques du fichier
+    df = charger("pathologies", regions=[region])
+    return construire_tenseur(df.assign(dept=df["dep_code"]))
+
+
+def prevalences(params):
+    tenseur = _tenseur(_region(params), version_donnees())
+    if not len(tenseur.annees):
+        raise ErreurRequete(f"aucune donnée de pathologie pour la région {params.get('region', REGION_DEFAUT)}")
+    try:
+        annee = int(params.get("annee", tenseur.annees.max()))
+    except ValueError:
+        raise ErreurRequete("annee doit être un entier")
+    if annee not in tenseur.annees:
+        raise ErreurRequete(f"année indisponible : {annee}")
+
+    df = taux_standardises(tenseur, population_reference(tenseur, annee=annee))
+    df = df[df["annee"] == annee]
+    if "dept" in params:
+        df = df[df["dept"] == code_departement([params["dept"]])[0]]
+    return df
+
+
+ROUTES = {
+    "/etablissements": personnes_par_etablissement,
+    "/etablissements/typologie": typologie_etablissements,
+    "/etablissements/autour": autour,
+    "/etablissements/emprise": emprise,
+    "/distances": distances,
+    "/pathologies": prevalences,
+}
+
+
+# ─── SÉRIALISATION ET CACHE ──────────────────────────────────────
+def serialiser(df, format_):
+    if format_ == "arrow":
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        tampon = io.BytesIO()
+        with pa.ipc.new_stream(tampon, table.schema) as flux:
+            flux.write_table(table)
+        return tampon.getvalue(), TYPE_ARROW
+    return df.to_json(orient="records", force_ascii=False).encode("utf-8"), TYPE_JSON
+
+
+class CacheLRU:
+    """Cache LRU borné, partagé entre les threads du serveur."""
+
+    def __init__(self, taille=TAILLE_CACHE):
+        self.taille = taille
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def get(self, cle):
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is not None:
+                self._entrees.move_to_end(cle)
+            return entree
+
+    def set(self, cle, entree):
+        with self._verrou:
+            self._entrees[cle] = entree
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille:
+                self._entrees.popitem(last=False)
+
+
+cache = CacheLRU()
+
+
+def repondre(chemin, params, format_):
+    """Corps, type et ETag d'une route, depuis le cache si possible."""
+    version = version_donnees()
+    cle = (chemin, tuple(sorted(params.items())), format_, version)
+    entree = cache.get(cle)
+    if entree is None:
+        corps, type_ = serialiser(ROUTES[chemin](params), format_)
+        etag = '"' + hashlib.sha1(repr(cle).encode() + corps).hexdigest()[:16] + '"'
+        entree = (corps, type_, etag)
+        cache.set(cle, entree)
+    return entree
+
+
+class Gestionnaire(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "app-sante-api"
+    # En-têtes et corps sont écrits séparément : sans TCP_NODELAY, chaque
+    # réponse en keep-alive attend l'ACK retardé du client (~40 ms)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        chemin = url.path.rstrip("/") or "/"
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if chemin == "/export":
+            return self._exporter(params)
+        if chemin not in ROUTES:
+            return self._erreur(HTTPStatus.NOT_FOUND, f"route inconnue : {chemin}")
+
+        format_ = params.pop("format", None)
+        if format_ is None:
+            format_ = "arrow" if TYPE_ARROW in self.headers.get("Accept", "") else "json"
+        if format_ not in FORMATS_REPONSE:
+            return self._erreur(HTTPStatus.BAD_REQUEST, f"format doit valoir l'un de : {', '.join(FORMATS_REPONSE)}")
+
+        try:
+            corps, type_, etag = repondre(chemin, params, format_)
+        except ErreurRequete as e:
+            return self._erreur(HTTPStatus.BAD_REQUEST, str(e))
+        except FileNotFoundError as e:
+            return self._erreur(HTTPStatus.SERVICE_UNAVAILABLE, f"données indisponibles : {e.filename}")
+        except Exception as e:
+            # Toujours une réponse JSON : le client ne doit pas voir la connexion coupée
+            traceback.print_exc()
+            return self._erreur(HTTPStatus.INTERNAL_SERVER_ERROR, "erreur interne")
+
+        if etag in self.headers.get("If-None-Match", ""):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", type_)
+        self.send_header("Content-Length", str(len(corps)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def _exporter(self, params):
+        """Extraction diffusée par blocs : le fichier complet n'est jamais construit en mémoire."""
+        jeu = params.get("jeu")
+        format_ = params.get("format", "csv")
+        if jeu not in SOURCES:
+            return self._erreur(HTTPStatus.BAD_REQUEST, f"jeu doit valoir l'un de : {', '.join(SOURCES)}")
+        if format_ not in FORMATS:
+            return self._erreur(HTTPStatus.BAD_REQUEST, f"format doit valoir l'un de : {', '.join(FORMATS)}")
+
+        regions = params["region"].split(",") if "region" in params else None
+        departements = params["dept"].split(",") if "dept" in params else None
+        try:
+            df = charger(jeu, regions=regions, departements=departements)
+            morceaux = iter_export(df, format_)
+            premier = next(morceaux)
+        except FileNotFoundError as e:
+            return self._erreur(HTTPStatus.SERVICE_UNAVAILABLE, f"données indisponibles : {e.filename}")
+        except ValueError as e:
+            return self._erreur(HTTPStatus.BAD_REQUEST, str(e))
+
+        mime, extension = FORMATS[format_]
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", mime)
+        self.send_header("Content-Disposition", f'attachment; filename="{jeu}.{extension}"')
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for morceau in chain([premier], morceaux):
+            if morceau:
+                self.wfile.write(b"%X\r\n%s\r\n" % (len(morceau), morceau))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _erreur(self, statut, message):
+        corps = json.dumps({"erreur": message}, ensure_ascii=False).encode("utf-8")
+        self.send_response(statut)
+        self.send_header("Content-Type", TYPE_JSON)
+        self.send_header("Content-Length", str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def log_message(self, format, *args):
+        # Pas de journal par requête : il coûte plus cher que la réponse en cache
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API locale des indicateurs de santé territoriaux.")
+    parser.add_argument("--hote", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args()
+
+    serveur = ThreadingHTTPServer((args.hote, args.port), Gestionnaire)
+    print(f"API disponible sur http://{args.hote}:{args.port}")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serveur.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Couche de données partagée par les pages : versions, stockage, contrôles."""
@@ -0,0 +1,175 @@
+"""
+Exports de données en CSV, Parquet, GeoJSON et XLSX.
+
+Les exports sont produits par blocs : `iter_export` est un générateur
+d'octets qui ne matérialise jamais le fichier complet (sauf XLSX, dont le
+format impose une écriture d'un seul tenant). Les pages ne l'appellent qu'au
+clic sur le bouton de téléchargement ; l'API le diffuse en
+`Transfer-Encoding: chunked`.
+"""
+
+import io
+import json
+import math
+
+import pandas as pd
+
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "geojson": ("application/geo+json", "geojson"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+TAILLE_BLOC = 50_000
+LIGNES_MAX_XLSX = 1_048_575
+
+# Colonnes de coordonnées reconnues pour les exports GeoJSON de points
+COORDONNEES = (("latitude", "longitude"), ("latitude_centre", "longitude_centre"))
+
+
+def formats_disponibles(df):
+    """Formats applicables à un tableau (GeoJSON seulement s'il est géolocalisé)."""
+    return [f for f in FORMATS if f != "geojson" or _colonnes_geo(df) is not None]
+
+
+def _colonnes_geo(df):
+    if "geometry" in df.columns:
+        return "geometry"
+    for lat, lon in COORDONNEES:
+        if lat in df.columns and lon in df.columns:
+            return lat, lon
+    return None
+
+
+def _blocs(df, taille_bloc):
+    for debut in range(0, len(df), taille_bloc):
+        yield df.iloc[debut:debut + taille_bloc]
+
+
+# ─── CSV ─────────────────────────────────────────────────────────
+def _iter_csv(df, taille_bloc):
+    if df.empty:
+        yield df.to_csv(index=False).encode("utf-8")
+        return
+    for i, bloc in enumerate(_blocs(df, taille_bloc)):
+        yield bloc.to_csv(index=False, header=(i == 0)).encode("utf-8")
+
+
+# ─── PARQUET ─────────────────────────────────────────────────────
+class _Puits:
+    """
+    Flux d'écriture vidé à chaque groupe de lignes : la position (`tell`)
+    reste cumulée pour que les offsets du pied de fichier Parquet soient justes.
+    """
+
+    def __init__(self):
+        self._morceaux = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, donnees):
+        self._morceaux.append(bytes(donnees))
+        self._position += len(donnees)
+        return len(donnees)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vider(self):
+        morceaux, self._morceaux = self._morceaux, []
+        return b"".join(morceaux)
+
+
+def _iter_parquet(df, taille_bloc):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = df.drop(columns="geometry", errors="ignore")
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    puits = _Puits()
+    with pq.ParquetWriter(pa.PythonFile(puits, mode="w"), schema) as ecrivain:
+        for bloc in _blocs(df, taille_bloc):
+            ecrivain.write_table(pa.Table.from_pandas(bloc, schema=schema, preserve_index=False))
+            yield puits.vider()
+    yield puits.vider()
+
+
+# ─── GEOJSON ─────────────────────────────────────────────────────
+def _valeur_json(v):
+    if v is pd.NA or (isinstance(v, float) and math.isnan(v)):
+        return None
+    if hasattr(v, "item"):
+        return v.item()
+    if isinstance(v, pd.Timestamp):
+        return v.isoformat()
+    return v
+
+
+def _iter_geojson(df, taille_bloc):
+    geo = _colonnes_geo(df)
+    if geo is None:
+        raise ValueError("Export GeoJSON impossible : ni géométrie ni coordonnées.")
+
+    yield b'{"type": "FeatureCollection", "features": ['
+    premier = True
+    for bloc in _blocs(df, taille_bloc):
+        if geo == "geometry":
+            geometries = [g.__geo_interface__ if g is not None else None for g in bloc["geometry"]]
+            proprietes = bloc.drop(columns="geometry")
+        else:
+            lat, lon = geo
+            geometries = [
+                {"type": "Point", "coordinates": [round(x, 6), round(y, 6)]}
+                if not (math.isnan(x) or math.isnan(y)) else None
+                for x, y in zip(bloc[lon].astype(float), bloc[lat].astype(float))
+            ]
+            proprietes = bloc.drop(columns=[lat, lon])
+
+        lignes = []
+        for geometrie, props in zip(geometries, proprietes.itertuples(index=False, name=None)):
+            feature = {
+                "type": "Feature",
+                "geometry": geometrie,
+                "properties": {c: _valeur_json(v) for c, v in zip(proprietes.columns, props)},
+            }
+            lignes.append(("" if premier else ",") + json.dumps(feature, ensure_ascii=False))
+            premier = False
+        yield "".join(lignes).encode("utf-8")
+    yield b"]}"
+
+
+# ─── XLSX ────────────────────────────────────────────────────────
+def _iter_xlsx(df, taille_bloc):
+    if len(df) > LIGNES_MAX_XLSX:
+        raise ValueError(f"Export XLSX limité à {LIGNES_MAX_XLSX:,} lignes ({len(df):,} demandées).")
+    tampon = io.BytesIO()
+    df.drop(columns="geometry", errors="ignore").to_excel(tampon, index=False)
+    yield tampon.getvalue()
+
+
+_EXPORTS = {
+    "csv": _iter_csv,
+    "parquet": _iter_parquet,
+    "geojson": _iter_geojson,
+    "xlsx": _iter_xlsx,
+}
+
+
+def iter_export(df, format_, taille_bloc=TAILLE_BLOC):
+    """Générateur des octets de l'export, bloc par bloc."""
+    if format_ not in _EXPORTS:
+        raise ValueError(f"Format d'export inconnu : {format_}")
+    return _EXPORTS[format_](df, taille_bloc)
+
+
+def exporter_octets(df, format_):
+    """Export complet en mémoire, pour les tableaux de taille raisonnable."""
+    return b"".join(iter_export(df, format_))
@@ -0,0 +1,146 @@
+"""
+Instantané des indicateurs clés, pour un premier affichage immédiat.
+
+Les chiffres d'en-tête (établissements, types, départements, population,
+personnes par établissement, distance moyenne aux urgences) sont calculés une
+fois, pour chaque région et chaque EPCI, et écrits dans un petit fichier JSON.
+Les pages les affichent sans attendre le chargement des jeux complets ; les
+cartes et tableaux suivent.
+
+L'instantané porte la version des fichiers sources : il est ignoré (et les
+indicateurs recalculés) dès qu'une source change sans qu'il soit régénéré.
+
+Usage :
+    python -m donnees.instantane
+"""
+
+import argparse
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+from donnees.stockage import charger, kpis_nationaux, version_sources
+
+
+FICHIER_INSTANTANE = Path("data/kpis_instantane.json")
+FORMAT = 1
+
+COLONNES_ETABS = ["numero finess etablissement", "type d etablissements", "code_insee"]
+
+
+def _communes(regions):
+    """Attributs des communes (EPCI, population), à défaut tirés du jeu des distances."""
+    colonnes = ["code_insee", "epci_code", "epci_nom", "population"]
+    try:
+        return charger("communes", regions=regions, colonnes=colonnes)
+    except FileNotFoundError:
+        return charger("distances", regions=regions, colonnes=colonnes)
+
+
+def _kpis(groupes_etabs, groupes_communes, groupes_distances):
+    """Indicateurs par territoire, à partir des trois jeux déjà groupés."""
+    kpis = groupes_etabs.agg(
+        total_etabs=("numero finess etablissement", "nunique"),
+        nb_types=("type d etablissements", "nunique"),
+        nb_deps=("dep_code", "nunique"),
+    ).join(
+        groupes_communes.agg(population=("population", "sum"), nb_communes=("code_insee", "nunique")),
+        how="outer",
+    ).join(
+        groupes_distances.agg(distance_urgence_moyenne=("distance_urgence_km", "mean")),
+        how="left",
+    )
+    kpis[["total_etabs", "nb_types", "nb_deps", "nb_communes"]] = (
+        kpis[["total_etabs", "nb_types", "nb_deps", "nb_communes"]].fillna(0).astype(int)
+    )
+    kpis["personnes_par_etab"] = kpis["population"] / kpis["total_etabs"].where(kpis["total_etabs"] > 0)
+    return kpis
+
+
+def _json(v):
+    # Scalaires NumPy -> Python, NaN -> null : le JSON reste lisible par tout client
+    if hasattr(v, "item"):
+        v = v.item()
+    return None if isinstance(v, float) and v != v else v
+
+
+def _en_dict(kpis):
+    return {
+        str(cle): {k: _json(v) for k, v in ligne.items()}
+        for cle, ligne in kpis.to_dict(orient="index").items()
+    }
+
+
+def kpis_regions(regions=None):
+    """Indicateurs d'en-tête de chaque région, calculés en un seul passage."""
+    etabs = charger("etablissements", regions=regions, colonnes=COLONNES_ETABS)
+    communes = _communes(regions)
+    distances = charger("distances", regions=regions, colonnes=["distance_urgence_km"])
+    return _en_dict(_kpis(
+        etabs.groupby("reg_code"), communes.groupby("reg_code"), distances.groupby("reg_code")
+    ))
+
+
+def kpis_epci(regions=None):
+    """Mêmes indicateurs pour chaque EPCI, établissements rattachés par commune."""
+    communes = _communes(regions)
+    etabs = charger("etablissements", regions=regions, colonnes=COLONNES_ETABS)
+    etabs = etabs.merge(
+        communes[["code_insee", "epci_code"]].drop_duplicates("code_insee"), on="code_insee", how="inner"
+    )
+    distances = charger("distances", regions=regions, colonnes=["epci_code", "distance_urgence_km"])
+
+    kpis = _kpis(
+        etabs.groupby("epci_code"), communes.groupby("epci_code"), distances.groupby("epci_code")
+    )
+    kpis["epci_nom"] = communes.drop_duplicates("epci_code").set_index("epci_code")["epci_nom"]
+    kpis["reg_code"] = communes.groupby("epci_code")["reg_code"].agg(lambda s: s.mode().iat[0])
+    kpis.index = kpis.index.astype(str).str.removesuffix(".0")
+    return _en_dict(kpis)
+
+
+def construire_instantane():
+    return {
+        "format": FORMAT,
+        "version": version_sources(),
+        "genere_le": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "france": {k: _json(v) for k, v in kpis_nationaux().items()},
+        "regions": kpis_regions(),
+        "epci": kpis_epci(),
+    }
+
+
+def ecrire_instantane(chemin=FICHIER_INSTANTANE):
+    instantane = construire_instantane()
+    chemin = Path(chemin)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    chemin.write_text(json.dumps(instantane, ensure_ascii=False, indent=1), encoding="utf-8")
+    return chemin
+
+
+def lire_instantane(chemin=FICHIER_INSTANTANE):
+    """L'instantané s'il existe et correspond aux sources actuelles, sinon None."""
+    try:
+        instantane = json.loads(Path(chemin).read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if instantane.get("format") != FORMAT or instantane.get("version") != version_sources():
+        return None
+    return instantane
+
+
+def kpis_epci_par_nom(instantane, epci_nom):
+    return next((k for k in instantane["epci"].values() if k["epci_nom"] == epci_nom), None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calcule l'instantané des indicateurs clés.")
+    parser.add_argument("--sortie", default=str(FICHIER_INSTANTANE))
+    args = parser.parse_args()
+
+    chemin = ecrire_instantane(args.sortie)
+    print(f"Instantané des indicateurs -> {chemin} ({chemin.stat().st_size:,} octets)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Contrôle qualité des jeux de données à l'ingestion.
+
+Chaque jeu passe une fois, lors de son partitionnement, par une série de
+contrôles vectorisés : coordonnées dans l'emprise de la région, numéros FINESS
+bien formés (clé de Luhn) et sans doublon, codes INSEE sur 5 caractères, cohérence population / densité,
+prévalence = Ntop / Npop. Les lignes fautives sont corrigées, neutralisées ou
+exclues, et un rapport est écrit dans `data/qualite/` : les pages reçoivent
+des données propres et typées et n'ont plus à se protéger à chaque rendu.
+
+Usage :
+    python -m donnees.qualite                 # contrôle les sources CSV, écrit les rapports
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from donnees.territoires import EMPRISES_REGIONS
+
+
+DOSSIER_RAPPORTS = Path("data/qualite")
+
+MARGE_EMPRISE = 0.1       # degrés
+TOLERANCE_DENSITE = 0.5   # hab/km², la densité source est arrondie à l'unité
+TOLERANCE_PREVALENCE = 0.005 + 1e-9  # points de %, la prévalence source est arrondie au centième
+
+FORMAT_FINESS = r"(?:\d{2}|2[AB]|9[A-F])\d{7}"
+
+
+class Rapport:
+    """Résultat des contrôles d'un jeu : une entrée par contrôle."""
+
+    def __init__(self, jeu, nb_lignes):
+        self.jeu = jeu
+        self.nb_lignes_entree = nb_lignes
+        self.controles = []
+
+    def ajouter(self, controle, masque, action):
+        self.controles.append({
+            "controle": controle,
+            "lignes": int(np.count_nonzero(masque)),
+            "action": action,
+        })
+
+    def en_dict(self, nb_lignes_sortie, duree):
+        return {
+            "jeu": self.jeu,
+            "lignes_entree": self.nb_lignes_entree,
+            "lignes_sortie": nb_lignes_sortie,
+            "duree_ms": round(1000 * duree, 1),
+            "controles": self.controles,
+        }
+
+
+# ─── CONTRÔLES ───────────────────────────────────────────────────
+def _colonnes_index(df, rapport):
+    # Index pandas sauvegardé par erreur dans les CSV ('Unnamed: 0')
+    colonnes = [c for c in df.columns if str(c).startswith("Unnamed:")]
+    if colonnes:
+        rapport.ajouter(f"colonnes d'index parasites ({', '.join(colonnes)})", np.ones(len(df), bool), "supprimées")
+    return df.drop(columns=colonnes)
+
+
+def _coordonnees(df, lat, lon, rapport):
+    """Coordonnées numériques et dans l'emprise de la région ; sinon neutralisées (NaN)."""
+    la = pd.to_numeric(df[lat], errors="coerce").to_numpy(dtype=float, copy=True)
+    lo = pd.to_numeric(df[lon], errors="coerce").to_numpy(dtype=float, copy=True)
+    emprises = pd.DataFrame.from_dict(EMPRISES_REGIONS, orient="index").reindex(df["reg_code"]).to_numpy()
+
+    with np.errstate(invalid="ignore"):
+        dedans = (
+            (la >= emprises[:, 0] - MARGE_EMPRISE) & (la <= emprises[:, 1] + MARGE_EMPRISE)
+            & (lo >= emprises[:, 2] - MARGE_EMPRISE) & (lo <= emprises[:, 3] + MARGE_EMPRISE)
+        )
+    manquantes = np.isnan(la) | np.isnan(lo)
+    hors = ~manquantes & ~dedans
+    rapport.ajouter("coordonnées manquantes ou non numériques", manquantes, "conservées vides")
+    rapport.ajouter("coordonnées hors de l'emprise de la région", hors, "neutralisées")
+    la[hors], lo[hors] = np.nan, np.nan
+    return df.assign(**{lat: la, lon: lo})
+
+
+def _code_insee(df, rapport):
+    """Code commune sur 5 caractères : le zéro initial perdu par un tableur est rétabli ('9001' -> '09001')."""
+    codes = df["code_insee"].str.strip()
+    courts = (codes.str.len() < 5).fillna(False).to_numpy(dtype=bool)
+    rapport.ajouter("code INSEE sans zéro initial", courts, "complétés")
+    return df.assign(code_insee=codes.str.zfill(5))
+
+
+def cle_finess_valide(numeros):
+    """Format FINESS et, pour les numéros entièrement numériques, clé de Luhn."""
+    numeros = pd.Series(numeros, dtype="string")
+    valide = numeros.str.fullmatch(FORMAT_FINESS).fillna(False).to_numpy(dtype=bool)
+
+    numeriques = valide & numeros.str.isdigit().fillna(False).to_numpy(dtype=bool)
+    if numeriques.any():
+        chiffres = np.frombuffer(
+            "".join(numeros[numeriques]).encode("ascii"), dtype=np.uint8
+        ).reshape(-1, 9).astype(np.int64) - ord("0")
+        # Luhn : un chiffre sur deux doublé en partant de la droite
+        chiffres[:, -2::-2] *= 2
+        chiffres[chiffres > 9] -= 9
+        valide[numeriques] = chiffres.sum(axis=1) % 10 == 0
+    return valide
+
+
+def _etablissements(df, rapport):
+    numeros = df["numero finess etablissement"]
+    invalides = ~cle_finess_valide(numeros)
+    rapport.ajouter("numéro FINESS absent ou invalide (format, clé)", invalides, "exclues")
+    df = df[~invalides]
+
+    doublons = df.duplicated().to_numpy()
+    rapport.ajouter("lignes en double", doublons, "exclues")
+    df = df[~doublons]
+
+    # Département du numéro FINESS (2 premiers caractères) et département déclaré
+    departement = df["departement"].astype(str).str.zfill(2)
+    incoherents = (df["numero finess etablissement"].str[:2] != departement).to_numpy()
+    rapport.ajouter("département du numéro FINESS différent du département déclaré", incoherents, "signalées")
+
+    df = _code_insee(df, rapport)
+    return _coordonnees(df, "latitude", "longitude", rapport)
+
+
+def _communes(df, rapport):
+    df = _code_insee(df, rapport)
+    population = pd.to_numeric(df["population"], errors="coerce")
+    invalides = (population.isna() | (population < 0)).to_numpy()
+    rapport.ajouter("population manquante ou négative", invalides, "mises à 0")
+    df = df.assign(population=population.where(~invalides, 0).astype("int64"))
+
+    if {"densite", "superficie_hectare"} <= set(df.columns):
+        superficie = pd.to_numeric(df["superficie_hectare"], errors="coerce") / 100
+        densite = (df["population"] / superficie.where(superficie > 0)).to_numpy()
+        with np.errstate(invalid="ignore"):
+            ecart = np.abs(densite - pd.to_numeric(df["densite"], errors="coerce").to_numpy())
+        incoherentes = ~(ecart <= TOLERANCE_DENSITE) & ~np.isnan(densite)
+        rapport.ajouter("densité incohérente avec population / superficie", incoherentes, "recalculées")
+        df = df.assign(densite=np.where(incoherentes, np.round(densite), df["densite"]))
+
+    if "distance_urgence_km" in df.columns:
+        distance = pd.to_numeric(df["distance_urgence_km"], errors="coerce")
+        negatives = (distance < 0).to_numpy()
+        rapport.ajouter("distance aux urgences négative", negatives, "neutralisées")
+        df = df.assign(distance_urgence_km=distance.mask(negatives))
+
+    return _coordonnees(df, "latitude_centre", "longitude_centre", rapport)
+
+
+def _pathologies(df, rapport):
+    cles = df[["annee", "dept", "libelle_classe_age", "patho_niv1"]].isna().any(axis=1).to_numpy()
+    ntop = pd.to_numeric(df["Ntop"], errors="coerce").to_numpy(dtype=float)
+    npop = pd.to_numeric(df["Npop"], errors="coerce").to_numpy(dtype=float)
+    with np.errstate(invalid="ignore"):
+        effectifs = ~((npop > 0) & (ntop >= 0) & (ntop <= npop))
+    rapport.ajouter("clé (année, département, âge, pathologie) incomplète", cles, "exclues")
+    rapport.ajouter("effectifs incohérents (Npop ≤ 0, Ntop < 0 ou Ntop > Npop)", effectifs & ~cles, "exclues")
+    garde = ~(cles | effectifs)
+    df, ntop, npop = df[garde], ntop[garde], npop[garde]
+
+    doublons = df.duplicated(["annee", "dept", "libelle_classe_age", "patho_niv1"]).to_numpy()
+    rapport.ajouter("clé (année, département, âge, pathologie) en double", doublons, "exclues")
+    df, ntop, npop = df[~doublons], ntop[~doublons], npop[~doublons]
+
+    prevalence = 100 * ntop / npop
+    with np.errstate(invalid="ignore"):
+        ecart = ~(np.abs(prevalence - pd.to_numeric(df["prev_calculee"], errors="coerce").to_numpy())
+                  <= TOLERANCE_PREVALENCE)
+    rapport.ajouter("prévalence différente de Ntop / Npop", ecart, "recalculées")
+    return df.assign(Ntop=ntop, Npop=npop, prev_calculee=np.where(ecart, prevalence.round(2), df["prev_calculee"]))
+
+
+def _iris(df, rapport):
+    # IRIS sans revenu diffusé (secret statistique, IRIS d'activité) : inutilisables pour la comparaison
+    revenu = pd.to_numeric(df["revenu_median"], errors="coerce")
+    manquants = revenu.isna().to_numpy()
+    rapport.ajouter("revenu médian manquant ou non numérique", manquants, "exclues")
+    df = df[~manquants].assign(revenu_median=revenu[~manquants])
+
+    qpv = pd.to_numeric(df["is_qpv"], errors="coerce")
+    rapport.ajouter("indicateur QPV manquant", qpv.isna().to_numpy(), "mises à 0 (hors QPV)")
+    return df.assign(is_qpv=qpv.fillna(0).astype("int8"))
+
+
+CONTROLES = {
+    "etablissements": _etablissements,
+    "etablissements_communes": _etablissements,
+    "communes": _communes,
+    "distances": _communes,
+    "pathologies": _pathologies,
+    "iris": _iris,
+}
+
+
+def valider(jeu, df):
+    """
+    Applique les contrôles d'un jeu (colonnes de partition déjà ajoutées).
+    Renvoie le jeu nettoyé et le rapport sous forme de dictionnaire.
+    """
+    debut = time.perf_counter()
+    rapport = Rapport(jeu, len(df))
+    df = _colonnes_index(df, rapport)
+    df = CONTROLES[jeu](df, rapport).reset_index(drop=True)
+    return df, rapport.en_dict(len(df), time.perf_counter() - debut)
+
+
+def chemin_rapport(jeu):
+    return DOSSIER_RAPPORTS / f"{jeu}.json"
+
+
+def ecrire_rapport(rapport):
+    chemin = chemin_rapport(rapport["jeu"])
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    chemin.write_text(json.dumps(rapport, ensure_ascii=False, indent=1), encoding="utf-8")
+    return chemin
+
+
+def lire_rapport(jeu):
+    """Dernier rapport de contrôle d'un jeu, ou None."""
+    try:
+        return json.loads(chemin_rapport(jeu).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def afficher(rapport):
+    print(f"{rapport['jeu']} : {rapport['lignes_entree']:,} -> {rapport['lignes_sortie']:,} lignes "
+          f"en {rapport['duree_ms']:.0f} ms")
+    for c in rapport["controles"]:
+        if c["lignes"]:
+            print(f"  - {c['controle']} : {c['lignes']:,} ({c['action']})")
+
+
+def main():
+    from donnees.stockage import SOURCES, lire_source
+
+    parser = argparse.ArgumentParser(description="Contrôle la qualité des jeux de données sources.")
+    parser.add_argument("jeux", nargs="*", metavar="jeu",
+                        help=f"{', '.join(sorted(SOURCES))} (par défaut : toutes les sources présentes)")
+    args = parser.parse_args()
+    inconnus = set(args.jeux) - set(SOURCES)
+    if inconnus:
+        parser.error(f"jeu inconnu : {', '.join(sorted(inconnus))}")
+
+    for jeu in args.jeux or [j for j, conf in SOURCES.items() if Path(conf["csv"]).exists()]:
+        _, rapport = lire_source(jeu)
+        ecrire_rapport(rapport)
+        afficher(rapport)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Agrégations des pages exprimées en requêtes SQL paramétrées.
+
+Quand DuckDB est installé et qu'un jeu est partitionné (voir
+`donnees.stockage`), les requêtes sont exécutées directement sur les fichiers
+Parquet : lecture hors mémoire, en parallèle, sans charger le jeu dans le tas
+Python. Sinon, la même agrégation est faite en pandas sur `charger()`.
+
+Les résultats, SQL comme pandas, sont mis en cache par requête, paramètres
+et version des fichiers.
+"""
+
+import threading
+from functools import lru_cache
+
+from donnees.stockage import SOURCES, chemin_jeu, charger
+from donnees.version import version_jeu
+
+try:
+    import duckdb
+except ImportError:  # dépendance optionnelle
+    duckdb = None
+
+
+_connexion = None
+_verrou_connexion = threading.Lock()
+
+
+def _connecter():
+    """Curseur propre à l'appelant sur la base partagée : une connexion DuckDB n'est pas sûre entre threads."""
+    global _connexion
+    with _verrou_connexion:
+        if _connexion is None:
+            _connexion = duckdb.connect(database=":memory:")
+            # Débordement sur disque au-delà de la limite mémoire
+            _connexion.execute("SET temp_directory = 'data/.duckdb_tmp'")
+        return _connexion.cursor()
+
+
+def moteur_sql_disponible(jeu):
+    """Vrai si la requête peut être exécutée par DuckDB sur les partitions."""
+    return duckdb is not None and chemin_jeu(jeu).exists()
+
+
+def _source(jeu):
+    chemin = (chemin_jeu(jeu) / "**" / "*.parquet").as_posix()
+    return (
+        f"read_parquet('{chemin}', hive_partitioning = true, "
+        "hive_types = {'reg_code': VARCHAR, 'dep_code': VARCHAR})"
+    )
+
+
+def _filtres(regions, departements, egalites):
+    """Clause WHERE et paramètres à partir des filtres territoriaux."""
+    clauses, params = ["TRUE"], []
+    if regions:
+        clauses.append("list_contains(?, reg_code)")
+        params.append(list(regions))
+    if departements:
+        clauses.append("list_contains(?, dep_code)")
+        params.append(list(departements))
+    for colonne, valeur in egalites:
+        clauses.append(f'"{colonne}" = ?')
+        params.append(valeur)
+    return " AND ".join(clauses), params
+
+
+def _hachables(valeurs):
+    return tuple(tuple(v) if isinstance(v, list) else v for v in valeurs)
+
+
+@lru_cache(maxsize=256)
+def _executer(sql, params, version):
+    with _connecter() as curseur:
+        return curseur.execute(sql, list(params)).df()
+
+
+def _requete(jeu, sql, params):
+    # Copie : le résultat en cache ne doit pas être modifié par l'appelant
+    return _executer(sql, _hachables(params), version_jeu(chemin_jeu(jeu))).copy()
+
+
+@lru_cache(maxsize=256)
+def _agreger(fonction, args, version):
+    return fonction(*args)
+
+
+def _calcul_pandas(jeu, fonction, *args):
+    """Agrégation pandas en cache ; la version couvre les partitions et, à défaut, le CSV source."""
+    version = version_jeu(chemin_jeu(jeu), SOURCES[jeu]["csv"])
+    return _agreger(fonction, _hachables(args), version).copy()
+
+
+def _filtrer_pandas(jeu, regions, departements, egalites, colonnes):
+    df = charger(jeu, regions=regions, departements=departements,
+                 colonnes=colonnes + [c for c, _ in egalites])
+    for colonne, valeur in egalites:
+        df = df[df[colonne] == valeur]
+    return df
+
+
+def typologie(jeu="etablissements", regions=None, departements=None, epci_nom=None):
+    """Nombre d'établissements par type, trié par effectif décroissant."""
+    egalites = (("epci_nom", epci_nom),) if epci_nom else ()
+
+    if moteur_sql_disponible(jeu):
+        where, params = _filtres(regions, departements, egalites)
+        sql = f"""
+            SELECT "type d etablissements",
+                   count("numero finess etablissement") AS nb_etablissements
+            FROM {_source(jeu)}
+            WHERE {where}
+            GROUP BY 1
+            ORDER BY nb_etablissements DESC
+        """
+        return _requete(jeu, sql, params)
+
+    return _calcul_pandas(jeu, _typologie_pandas, jeu, regions, departements, egalites)
+
+
+def _typologie_pandas(jeu, regions, departements, egalites):
+    df = _filtrer_pandas(jeu, regions, departements, egalites,
+                         ["type d etablissements", "numero finess etablissement"])
+    return (
+        df.groupby('type d etablissements')
+          .agg(nb_etablissements=('numero finess etablissement', 'count'))
+          .reset_index()
+          .sort_values('nb_etablissements', ascending=False)
+    )
+
+
+def distance_moyenne_par(colonne, regions=None, departements=None):
+    """Distance moyenne aux urgences par modalité de `colonne` (dep_nom, grille_densite_texte…)."""
+    jeu = "distances"
+
+    if moteur_sql_disponible(jeu):
+        where, params = _filtres(regions, departements, ())
+        sql = f"""
+            SELECT "{colonne}", avg(distance_urgence_km) AS distance_urgence_km
+            FROM {_source(jeu)}
+            WHERE {where}
+            GROUP BY 1
+            ORDER BY distance_urgence_km
+        """
+        return _requete(jeu, sql, params)
+
+    return _calcul_pandas(jeu, _distance_moyenne_pandas, colonne, regions, departements)
+
+
+def _distance_moyenne_pandas(colonne, regions, departements):
+    df = charger("distances", regions=regions, departements=departements,
+                 colonnes=[colonne, "distance_urgence_km"])
+    return (
+        df.groupby(colonne)['distance_urgence_km']
+          .mean()
+          .reset_index()
+          .sort_values('distance_urgence_km')
+    )
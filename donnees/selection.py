@@ -0,0 +1,18 @@
+"""Sélecteurs territoriaux partagés par les pages Streamlit."""
+
+import streamlit as st
+
+from donnees.territoires import REGION_DEFAUT, REGIONS
+
+
+def selection_region(disponibles):
+    """Sélecteur de région dans la barre latérale (régions présentes dans les données)."""
+    options = [r for r in REGIONS if r in set(disponibles)] or [REGION_DEFAUT]
+    index = options.index(REGION_DEFAUT) if REGION_DEFAUT in options else 0
+    return st.sidebar.selectbox(
+        "Région",
+        options,
+        index=index,
+        format_func=REGIONS.get,
+        key="region"
+    )
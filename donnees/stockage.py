@@ -0,0 +1,208 @@
+"""
+Stockage partitionné par région et département.
+
+Chaque jeu de données est écrit en Parquet sous
+`data/partitions/<jeu>/reg_code=XX/dep_code=YY/`. Les chargeurs ne lisent que
+les partitions des territoires demandés (filtres poussés jusqu'au lecteur
+Parquet) et seulement les colonnes utiles : une vue régionale coûte le même
+prix que l'ancien fichier Occitanie, même quand la France entière est stockée.
+
+Tant qu'un jeu n'a pas été partitionné, son fichier CSV d'origine est lu et
+filtré en mémoire. Dans les deux cas, les données passent d'abord par le
+contrôle qualité de `donnees.qualite`.
+
+Usage :
+    python -m donnees.stockage etablissements --source data/finess_france.csv
+"""
+
+import argparse
+import shutil
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from donnees.qualite import ecrire_rapport, valider
+from donnees.territoires import code_departement, code_region
+from donnees.version import version_jeu
+
+
+RACINE_PARTITIONS = Path("data/partitions")
+CLES_PARTITION = ["reg_code", "dep_code"]
+
+# Fichier source et colonne départementale de chaque jeu
+SOURCES = {
+    "etablissements": {
+        "csv": "data/finess_occitanie2.csv",
+        "departement": "departement",
+        "dtype": {"departement": str, "numero finess etablissement": str, "code_insee": str},
+    },
+    "etablissements_communes": {
+        "csv": "data/finess_occitanie_join.csv",
+        "departement": "departement",
+        "dtype": {"departement": str, "numero finess etablissement": str, "code_insee": str},
+    },
+    "communes": {
+        "csv": "data/communes-france-2025.csv",
+        "departement": "dep_code",
+        "dtype": {"code_insee": str, "dep_code": str, "reg_code": str},
+    },
+    "distances": {
+        "csv": "data/distances_communes_urgence_occitanie.csv",
+        "departement": "dep_code",
+        "dtype": {"code_insee": str, "dep_code": str, "reg_code": str},
+    },
+    "pathologies": {
+        "csv": "data/pathologie_clean.csv",
+        "departement": "dept",
+        "dtype": {},
+    },
+}
+
+
+def _ajouter_cles(df, jeu):
+    """Ajoute les colonnes de partition normalisées (codes en texte)."""
+    dep = code_departement(df[SOURCES[jeu]["departement"]])
+    return df.assign(dep_code=dep.values, reg_code=code_region(dep).values)
+
+
+def _lire_csv(jeu, source=None):
+    conf = SOURCES[jeu]
+    return pd.read_csv(source or conf["csv"], dtype=conf["dtype"])
+
+
+def lire_source(jeu, source=None):
+    """Fichier source contrôlé et nettoyé, avec son rapport de qualité."""
+    return valider(jeu, _ajouter_cles(_lire_csv(jeu, source), jeu))
+
+
+@lru_cache(maxsize=len(SOURCES))
+def _source_controlee(jeu, version):
+    # Contrôle qualité fait une fois par version du CSV, pas à chaque chargement
+    return lire_source(jeu)[0]
+
+
+def version_sources():
+    """
+    Version des fichiers sources et de leurs partitions. Les artefacts dérivés
+    (rapports qualité, instantané des indicateurs) n'en font pas partie : les
+    réécrire n'invalide pas les caches.
+    """
+    return version_jeu(*(conf["csv"] for conf in SOURCES.values()), RACINE_PARTITIONS)
+
+
+def chemin_jeu(jeu):
+    return RACINE_PARTITIONS / jeu
+
+
+def partitionner(jeu, source=None):
+    """Réécrit un jeu de données contrôlé en Parquet partitionné par région/département."""
+    df, rapport = lire_source(jeu, source)
+    ecrire_rapport(rapport)
+    df = df.dropna(subset=CLES_PARTITION)
+
+    chemin = chemin_jeu(jeu)
+    if chemin.exists():
+        shutil.rmtree(chemin)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    df.to_parquet(chemin, partition_cols=CLES_PARTITION, index=False)
+    return chemin
+
+
+def _partitionnement():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    # Codes lus comme du texte ('09', '2A') et non inférés en entiers
+    schema = pa.schema([(cle, pa.string()) for cle in CLES_PARTITION])
+    return ds.partitioning(schema, flavor="hive")
+
+
+def charger(jeu, regions=None, departements=None, colonnes=None):
+    """
+    Charge un jeu de données restreint aux régions / départements demandés.
+
+    `regions` et `departements` sont des listes de codes officiels ('76',
+    '31') ; `colonnes` limite les colonnes lues. Les colonnes `reg_code` et
+    `dep_code` sont toujours présentes dans le résultat.
+    """
+    colonnes_lues = None if colonnes is None else list(dict.fromkeys(list(colonnes) + CLES_PARTITION))
+
+    chemin = chemin_jeu(jeu)
+    if chemin.exists():
+        filtres = []
+        if regions:
+            filtres.append(("reg_code", "in", list(regions)))
+        if departements:
+            filtres.append(("dep_code", "in", list(departements)))
+        df = pd.read_parquet(
+            chemin,
+            columns=colonnes_lues,
+            filters=filtres or None,
+            partitioning=_partitionnement(),
+        )
+        for cle in CLES_PARTITION:
+            df[cle] = df[cle].astype(str)
+        return df
+
+    df = _source_controlee(jeu, version_jeu(SOURCES[jeu]["csv"]))
+    masque = pd.Series(True, index=df.index)
+    if regions:
+        masque &= df["reg_code"].isin(list(regions))
+    if departements:
+        masque &= df["dep_code"].isin(list(departements))
+    df = df[masque]
+    return df if colonnes_lues is None else df[colonnes_lues]
+
+
+def regions_disponibles(jeu):
+    """Codes région présents dans un jeu (sans lire les données si partitionné)."""
+    chemin = chemin_jeu(jeu)
+    if chemin.exists():
+        return sorted(p.name.split("=", 1)[1] for p in chemin.glob("reg_code=*"))
+    # Source CSV contrôlée une fois par version, partagée avec `charger`
+    df = _source_controlee(jeu, version_jeu(SOURCES[jeu]["csv"]))
+    return sorted(df["reg_code"].dropna().unique())
+
+
+def kpis_nationaux():
+    """
+    Indicateurs de comparaison calculés sur l'ensemble des partitions
+    disponibles, en ne lisant que les colonnes nécessaires.
+    """
+    etabs = charger("etablissements", colonnes=["numero finess etablissement", "type d etablissements"])
+    communes = charger("communes", colonnes=["population"])
+
+    total_etabs = etabs["numero finess etablissement"].nunique()
+    population = communes["population"].sum()
+    return {
+        "regions": sorted(etabs["reg_code"].dropna().unique()),
+        "total_etabs": total_etabs,
+        "nb_types": etabs["type d etablissements"].nunique(),
+        "nb_deps": etabs["dep_code"].nunique(),
+        "population": population,
+        "personnes_par_etab": population / total_etabs if total_etabs else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partitionne un jeu de données par région et département.")
+    parser.add_argument("jeux", nargs="+", choices=sorted(SOURCES))
+    parser.add_argument("--source", help="fichier CSV à utiliser à la place de la source par défaut")
+    args = parser.parse_args()
+
+    for jeu in args.jeux:
+        chemin = partitionner(jeu, args.source)
+        print(f"{jeu} -> {chemin}")
+
+    # Les indicateurs d'en-tête suivent les partitions
+    from donnees.instantane import ecrire_instantane
+
+    try:
+        print(f"indicateurs -> {ecrire_instantane()}")
+    except FileNotFoundError as e:
+        print(f"indicateurs non calculés, source absente : {e.filename}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Boutons de téléchargement des pages : export produit au clic et mis en cache."""
+
+from functools import partial
+
+import streamlit as st
+
+from donnees.export import FORMATS, exporter_octets, formats_disponibles
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _octets_export(_df, format_, cle, etat):
+    # `cle` (bouton, fichier) et `etat` (version, filtres, région) forment la clé de cache :
+    # le tableau lui-même n'est pas haché
+    return exporter_octets(_df, format_)
+
+
+def bouton_export(df, nom_fichier, etat, key):
+    """
+    Sélecteur de format et bouton de téléchargement. Le fichier n'est généré
+    qu'au clic, puis réutilisé tant que `etat` ne change pas ; `etat` doit
+    inclure la version des données affichées.
+    """
+    col1, col2 = st.columns([1, 3])
+    format_ = col1.selectbox("Format", formats_disponibles(df), key=f"format_{key}")
+    mime, extension = FORMATS[format_]
+    col2.download_button(
+        "📥 Télécharger les données",
+        data=partial(_octets_export, df, format_, (key, nom_fichier), tuple(etat)),
+        file_name=f"{nom_fichier}.{extension}",
+        mime=mime,
+        on_click="ignore",
+        key=f"export_{key}"
+    )
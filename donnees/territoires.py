@@ -0,0 +1,142 @@
+"""
+Référentiel des régions et départements français (découpage 2016).
+
+Sert de clé de partitionnement pour le stockage et de source unique pour les
+filtres territoriaux des pages (plus de 'Occitanie' ni de liste de
+départements écrits en dur).
+"""
+
+import pandas as pd
+
+
+REGIONS = {
+    "01": "Guadeloupe",
+    "02": "Martinique",
+    "03": "Guyane",
+    "04": "La Réunion",
+    "06": "Mayotte",
+    "11": "Île-de-France",
+    "24": "Centre-Val de Loire",
+    "27": "Bourgogne-Franche-Comté",
+    "28": "Normandie",
+    "32": "Hauts-de-France",
+    "44": "Grand Est",
+    "52": "Pays de la Loire",
+    "53": "Bretagne",
+    "75": "Nouvelle-Aquitaine",
+    "76": "Occitanie",
+    "84": "Auvergne-Rhône-Alpes",
+    "93": "Provence-Alpes-Côte d'Azur",
+    "94": "Corse",
+}
+
+_DEPARTEMENTS_PAR_REGION = {
+    "01": ["971"],
+    "02": ["972"],
+    "03": ["973"],
+    "04": ["974"],
+    "06": ["976"],
+    "11": ["75", "77", "78", "91", "92", "93", "94", "95"],
+    "24": ["18", "28", "36", "37", "41", "45"],
+    "27": ["21", "25", "39", "58", "70", "71", "89", "90"],
+    "28": ["14", "27", "50", "61", "76"],
+    "32": ["02", "59", "60", "62", "80"],
+    "44": ["08", "10", "51", "52", "54", "55", "57", "67", "68", "88"],
+    "52": ["44", "49", "53", "72", "85"],
+    "53": ["22", "29", "35", "56"],
+    "75": ["16", "17", "19", "23", "24", "33", "40", "47", "64", "79", "86", "87"],
+    "76": ["09", "11", "12", "30", "31", "32", "34", "46", "48", "65", "66", "81", "82"],
+    "84": ["01", "03", "07", "15", "26", "38", "42", "43", "63", "69", "73", "74"],
+    "93": ["04", "05", "06", "13", "83", "84"],
+    "94": ["2A", "2B"],
+}
+
+REGION_PAR_DEPARTEMENT = {
+    dep: reg for reg, deps in _DEPARTEMENTS_PAR_REGION.items() for dep in deps
+}
+
+REGION_DEFAUT = "76"
+
+# Emprise de chaque région (lat_min, lat_max, lon_min, lon_max), en degrés
+EMPRISES_REGIONS = {
+    "01": (15.80, 16.55, -61.85, -60.95),
+    "02": (14.35, 14.90, -61.25, -60.80),
+    "03": (2.10, 5.80, -54.65, -51.60),
+    "04": (-21.40, -20.85, 55.20, 55.85),
+    "06": (-13.05, -12.60, 45.00, 45.30),
+    "11": (48.10, 49.25, 1.40, 3.60),
+    "24": (46.30, 48.95, 0.05, 3.15),
+    "27": (46.15, 48.40, 2.80, 7.20),
+    "28": (48.15, 50.10, -1.95, 1.80),
+    "32": (48.80, 51.10, 1.35, 4.30),
+    "44": (47.40, 50.20, 3.35, 8.25),
+    "52": (46.25, 48.60, -2.65, 0.95),
+    "53": (47.25, 48.90, -5.20, -1.00),
+    "75": (42.75, 47.20, -1.80, 2.65),
+    "76": (42.30, 45.05, -0.35, 4.85),
+    "84": (44.10, 46.80, 2.05, 7.20),
+    "93": (42.95, 45.15, 4.20, 7.75),
+    "94": (41.30, 43.05, 8.50, 9.60),
+}
+
+# Codes départementaux à lettre utilisés par le FINESS pour l'outre-mer
+_DOM_FINESS = {"9A": "971", "9B": "972", "9C": "973", "9D": "974", "9F": "976"}
+
+
+def departements_region(reg_code):
+    """Codes des départements d'une région."""
+    return list(_DEPARTEMENTS_PAR_REGION[reg_code])
+
+
+def code_departement(valeurs):
+    """
+    Normalise une colonne de codes départementaux ('9', 9, '09', '9A', '971')
+    vers le code officiel sur deux ou trois caractères.
+    """
+    codes = pd.Series(valeurs).astype(str).str.strip().str.upper()
+    codes = codes.str.replace(r"\.0$", "", regex=True).str.zfill(2)
+    return codes.replace(_DOM_FINESS)
+
+
+def departement_commune(codes_insee):
+    """
+    Code départemental d'une colonne de codes communes INSEE : deux premiers
+    caractères, trois pour les départements d'outre-mer (971 à 976).
+    """
+    codes = pd.Series(codes_insee).astype(str).str.strip().str.zfill(5)
+    return code_departement(codes.str[:2].where(codes.str[:2] != "97", codes.str[:3]))
+
+
+def code_region(dep_codes):
+    """Code région de chaque code départemental (normalisé)."""
+    return code_departement(dep_codes).map(REGION_PAR_DEPARTEMENT)
+
+
+NOMS_DEPARTEMENTS = {
+    "01": "Ain", "02": "Aisne", "03": "Allier", "04": "Alpes-de-Haute-Provence",
+    "05": "Hautes-Alpes", "06": "Alpes-Maritimes", "07": "Ardèche", "08": "Ardennes",
+    "09": "Ariège", "10": "Aube", "11": "Aude", "12": "Aveyron",
+    "13": "Bouches-du-Rhône", "14": "Calvados", "15": "Cantal", "16": "Charente",
+    "17": "Charente-Maritime", "18": "Cher", "19": "Corrèze", "2A": "Corse-du-Sud",
+    "2B": "Haute-Corse", "21": "Côte-d'Or", "22": "Côtes-d'Armor", "23": "Creuse",
+    "24": "Dordogne", "25": "Doubs", "26": "Drôme", "27": "Eure",
+    "28": "Eure-et-Loir", "29": "Finistère", "30": "Gard", "31": "Haute-Garonne",
+    "32": "Gers", "33": "Gironde", "34": "Hérault", "35": "Ille-et-Vilaine",
+    "36": "Indre", "37": "Indre-et-Loire", "38": "Isère", "39": "Jura",
+    "40": "Landes", "41": "Loir-et-Cher", "42": "Loire", "43": "Haute-Loire",
+    "44": "Loire-Atlantique", "45": "Loiret", "46": "Lot", "47": "Lot-et-Garonne",
+    "48": "Lozère", "49": "Maine-et-Loire", "50": "Manche", "51": "Marne",
+    "52": "Haute-Marne", "53": "Mayenne", "54": "Meurthe-et-Moselle", "55": "Meuse",
+    "56": "Morbihan", "57": "Moselle", "58": "Nièvre", "59": "Nord",
+    "60": "Oise", "61": "Orne", "62": "Pas-de-Calais", "63": "Puy-de-Dôme",
+    "64": "Pyrénées-Atlantiques", "65": "Hautes-Pyrénées", "66": "Pyrénées-Orientales", "67": "Bas-Rhin",
+    "68": "Haut-Rhin", "69": "Rhône", "70": "Haute-Saône", "71": "Saône-et-Loire",
+    "72": "Sarthe", "73": "Savoie", "74": "Haute-Savoie", "75": "Paris",
+    "76": "Seine-Maritime", "77": "Seine-et-Marne", "78": "Yvelines", "79": "Deux-Sèvres",
+    "80": "Somme", "81": "Tarn", "82": "Tarn-et-Garonne", "83": "Var",
+    "84": "Vaucluse", "85": "Vendée", "86": "Vienne", "87": "Haute-Vienne",
+    "88": "Vosges", "89": "Yonne", "90": "Territoire de Belfort", "91": "Essonne",
+    "92": "Hauts-de-Seine", "93": "Seine-Saint-Denis", "94": "Val-de-Marne", "95": "Val-d'Oise",
+    "971": "Guadeloupe", "972": "Martinique", "973": "Guyane", "974": "La Réunion",
+    "976": "Mayotte",
+}
@@ -0,0 +1,25 @@
+"""
+Version des jeux de données.
+
+La version est une empreinte courte des fichiers sources (nom, taille, date
+de modification) : elle sert de clé de cache aux calculs coûteux et change
+dès qu'un fichier est remplacé.
+"""
+
+import hashlib
+from pathlib import Path
+
+
+def version_jeu(*chemins):
+    """Empreinte courte d'un ou plusieurs fichiers (ou dossiers) de données."""
+    h = hashlib.sha1()
+    for chemin in chemins:
+        chemin = Path(chemin)
+        fichiers = sorted(chemin.rglob("*")) if chemin.is_dir() else [chemin]
+        for f in fichiers:
+            # Fichiers temporaires (dossiers cachés) exclus de l'empreinte
+            if not f.is_file() or any(p.startswith(".") for p in f.relative_to(chemin.parent).parts):
+                continue
+            stat = f.stat()
+            h.update(f"{f.as_posix()}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return h.hexdigest()[:12]
@@ -0,0 +1 @@
+"""Établissements FINESS : recherche, requêtes spatiales et cartes."""
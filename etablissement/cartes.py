@@ -0,0 +1,190 @@
+"""
+Cartes Plotly compactes.
+
+`px.scatter_map` sérialise chaque coordonnée en décimal JSON, recopie les
+colonnes de survol point par point dans `customdata` et crée une trace par
+modalité de couleur. Les cartes construites ici n'ont qu'une trace de points :
+coordonnées arrondies en float32 et couleurs codées en entiers, transmises en
+tableaux typés (base64), points superposés de même couleur envoyés une seule
+fois. Un point regroupe alors toutes les lignes de sa position : leurs noms
+sont listés au survol et leurs fiches affichées au clic. Les textes de survol
+ne sont joints que pour les petites sélections ; au-delà, la fiche d'un point
+est chargée au clic (`point_selectionne`).
+
+Mesure de la taille des cartes avant / après :
+    python -m etablissement.cartes
+"""
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+
+
+PRECISION = 5        # décimales conservées, soit ~1 m
+SURVOL_MAX = 2000    # au-delà, pas de texte de survol envoyé avec la carte
+NOMS_SURVOL = 8      # noms listés au survol d'un point regroupant plusieurs lignes
+PALETTE = px.colors.qualitative.Plotly + px.colors.qualitative.Dark24 + px.colors.qualitative.Light24
+
+
+def _echelle_discrete(couleurs):
+    """Échelle en paliers : le code i (cmin=-0.5, cmax=n-0.5) reçoit couleurs[i]."""
+    n = len(couleurs)
+    echelle = []
+    for i, couleur in enumerate(couleurs):
+        echelle += [[i / n, couleur], [(i + 1) / n, couleur]]
+    return echelle
+
+
+def carte_points(df, lat="latitude", lon="longitude", couleur=None, survol=None,
+                 continue_=False, echelle="Viridis", zoom=6, height=650,
+                 precision=PRECISION, survol_max=SURVOL_MAX):
+    """
+    Carte de points en une seule trace. Renvoie la figure et, pour chaque point
+    tracé, les positions dans `df` des lignes qu'il regroupe (mêmes
+    coordonnées et même couleur), pour retrouver les lignes d'un point cliqué.
+
+    `couleur` est une colonne catégorielle (légende) ou, avec `continue_=True`,
+    numérique (barre de couleur). `survol` est la colonne affichée au survol
+    quand la carte compte au plus `survol_max` points.
+    """
+    # Coordonnées déjà numériques : le contrôle qualité à l'ingestion les a converties
+    coords = df[[lat, lon]].to_numpy(dtype=float).round(precision)
+    garde = ~np.isnan(coords).any(axis=1)
+
+    valeurs, modalites = None, None
+    if couleur is not None and continue_:
+        valeurs = df[couleur].to_numpy(dtype=float)
+        garde &= ~np.isnan(valeurs)
+    elif couleur is not None:
+        categories = pd.Categorical(df[couleur])
+        valeurs, modalites = categories.codes, categories.categories
+        garde &= valeurs >= 0
+
+    # Plusieurs lignes par établissement (une par activité) et établissements à la même adresse :
+    # un seul point par position et couleur, qui garde la liste de ses lignes
+    lignes = np.flatnonzero(garde)
+    cles = pd.DataFrame({"lat": coords[lignes, 0], "lon": coords[lignes, 1]})
+    if valeurs is not None:
+        cles["valeur"] = valeurs[lignes]
+    groupe = cles.groupby(list(cles.columns), sort=False).ngroup().to_numpy()
+    ordre = np.argsort(groupe, kind="stable")
+    debuts = np.flatnonzero(np.diff(groupe[ordre], prepend=-1))
+    membres = np.split(lignes[ordre], debuts[1:]) if len(lignes) else []
+    positions = lignes[ordre][debuts]  # première ligne de chaque point
+
+    marker = dict(size=8)
+    traces_legende = []
+    if modalites is not None and len(positions):
+        codes = valeurs[positions]
+        presentes = np.unique(codes)
+        # Codes renumérotés sur les seules modalités présentes, pour des couleurs stables et distinctes
+        couleurs = [PALETTE[i % len(PALETTE)] for i in range(len(presentes))]
+        marker.update(
+            color=np.searchsorted(presentes, codes).astype(np.int16),
+            colorscale=_echelle_discrete(couleurs),
+            cmin=-0.5,
+            cmax=len(presentes) - 0.5,
+        )
+        traces_legende = [
+            go.Scattermap(lat=[], lon=[], mode="markers", name=str(modalites[code]),
+                          marker=dict(size=8, color=c), hoverinfo="skip")
+            for code, c in zip(presentes, couleurs)
+        ]
+    elif valeurs is not None:
+        marker.update(
+            color=valeurs[positions].astype(np.float32),
+            colorscale=echelle,
+            showscale=True,
+            colorbar=dict(title=couleur),
+        )
+
+    trace = go.Scattermap(
+        lat=coords[positions, 0].astype(np.float32),
+        lon=coords[positions, 1].astype(np.float32),
+        mode="markers",
+        marker=marker,
+        name="",
+        showlegend=False,
+        hoverinfo="none",
+    )
+    if survol is not None and len(positions) <= survol_max:
+        noms = df[survol].astype(str).to_numpy()
+        trace.update(hovertext=[_texte_survol(noms[m]) for m in membres], hoverinfo="text")
+
+    fig = go.Figure([trace, *traces_legende])
+    fig.update_layout(
+        height=height,
+        map_style="open-street-map",
+        map_zoom=zoom,
+        legend_title_text=couleur if modalites is not None else None,
+        margin={"r":0, "t":0, "l":0, "b":0}
+    )
+    return fig, membres
+
+
+def _texte_survol(noms):
+    """Nom du point, ou liste des noms distincts qu'il regroupe."""
+    distincts = list(dict.fromkeys(noms))
+    if len(distincts) == 1:
+        return distincts[0]
+    texte = f"{len(distincts)} à cette adresse :<br>" + "<br>".join(distincts[:NOMS_SURVOL])
+    if len(distincts) > NOMS_SURVOL:
+        texte += f"<br>… et {len(distincts) - NOMS_SURVOL} autres"
+    return texte
+
+
+def point_selectionne(evenement, membres):
+    """Positions dans le DataFrame d'origine des lignes du point cliqué sur la carte, ou None."""
+    if not evenement:
+        return None
+    points = [p for p in evenement["selection"]["points"] if p.get("curve_number") == 0]
+    if not points:
+        return None
+    # Sélection mémorisée par le widget alors que les filtres ont changé le nombre de points
+    indice = points[0]["point_index"]
+    return membres[indice] if 0 <= indice < len(membres) else None
+
+
+def taille_figure(fig):
+    """Octets envoyés au navigateur pour une figure (sérialisation de st.plotly_chart)."""
+    return len(pio.to_json(fig, validate=False).encode("utf-8"))
+
+
+# ─── MESURE ──────────────────────────────────────────────────────
+def main():
+    from donnees.stockage import charger
+    from donnees.territoires import REGION_DEFAUT
+
+    etabs = charger("etablissements", regions=[REGION_DEFAUT])
+    communes = charger("distances", regions=[REGION_DEFAUT])
+
+    cas = {
+        "Établissements par type": (
+            px.scatter_map(etabs, lat="latitude", lon="longitude", hover_name="raison_sociale",
+                           hover_data={"type d etablissements": True}, color="type d etablissements"),
+            carte_points(etabs, couleur="type d etablissements", survol="raison_sociale")[0],
+        ),
+        "Soins par activité": (
+            px.scatter_map(etabs, lat="latitude", lon="longitude", hover_name="raison_sociale",
+                           hover_data={"type d etablissements": True}, color="libelle activite"),
+            carte_points(etabs, couleur="libelle activite", survol="raison_sociale")[0],
+        ),
+        "Distances aux urgences": (
+            px.scatter_map(communes, lat="latitude_centre", lon="longitude_centre", hover_name="nom_standard",
+                           hover_data={"dep_nom": True, "distance_urgence_km": True},
+                           color="distance_urgence_km"),
+            carte_points(communes, lat="latitude_centre", lon="longitude_centre",
+                         couleur="distance_urgence_km", continue_=True, survol="nom_standard")[0],
+        ),
+    }
+
+    print(f"{'Carte':<26}{'avant':>12}{'après':>12}{'gain':>8}")
+    for nom, (avant, apres) in cas.items():
+        a, b = taille_figure(avant), taille_figure(apres)
+        print(f"{nom:<26}{a:>12,}{b:>12,}{a / b:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Recherche instantanée des établissements par trigrammes.
+
+Le texte indexé (raison sociale, raison sociale longue, commune, numéro
+FINESS) est normalisé sans accents ni casse puis découpé en trigrammes.
+L'index inversé associe chaque trigramme au tableau des établissements qui le
+contiennent : une requête se résout par un comptage NumPy sur ces listes, ce
+qui tolère les fautes de frappe et les mots tronqués.
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+COLONNES_INDEXEES = ("raison_sociale", "rslongue", "nom_standard", "numero finess etablissement")
+
+SCORE_MIN = 0.45
+
+
+def normaliser(texte):
+    """Minuscules sans accents, ponctuation remplacée par des espaces."""
+    texte = unicodedata.normalize("NFKD", str(texte))
+    texte = "".join(c for c in texte if not unicodedata.combining(c)).lower()
+    return re.sub(r"[^a-z0-9]+", " ", texte).strip()
+
+
+def trigrammes(texte):
+    """Trigrammes des mots d'un texte normalisé, bornés par des espaces."""
+    grams = set()
+    for mot in texte.split():
+        mot = f" {mot} "
+        grams.update(mot[i:i + 3] for i in range(len(mot) - 2))
+    return grams
+
+
+@dataclass
+class IndexTrigrammes:
+    trigrammes: dict          # trigramme -> np.ndarray[int32] des lignes
+    textes: np.ndarray        # texte normalisé de chaque ligne
+    nb_trigrammes: np.ndarray  # nombre de trigrammes distincts par ligne
+
+    @classmethod
+    def construire(cls, df, colonnes=COLONNES_INDEXEES):
+        colonnes = [c for c in colonnes if c in df.columns]
+        textes = (
+            df[colonnes].fillna("").astype(str).agg(" ".join, axis=1).map(normaliser)
+        ).to_numpy()
+
+        grams = pd.Series([sorted(trigrammes(t)) for t in textes])
+        nb = grams.str.len().to_numpy()
+        eclate = grams.explode().dropna()
+
+        # Listes inversées : tri par trigramme puis découpage aux changements de clé
+        cles = eclate.to_numpy(dtype=str)
+        lignes = eclate.index.to_numpy(dtype=np.int32)
+        ordre = np.argsort(cles, kind="stable")
+        cles, lignes = cles[ordre], lignes[ordre]
+        uniques, debuts = np.unique(cles, return_index=True)
+        postings = dict(zip(uniques.tolist(), np.split(lignes, debuts[1:])))
+        return cls(postings, textes, nb)
+
+    def rechercher(self, requete, k=10, score_min=SCORE_MIN):
+        """
+        Positions des `k` meilleures lignes et leur score (0-1).
+
+        Le score est la part des trigrammes de la requête présents dans la
+        ligne, avec un bonus quand la requête apparaît telle quelle.
+        """
+        requete = normaliser(requete)
+        grams = trigrammes(requete)
+        if not grams:
+            return np.array([], dtype=np.int32), np.array([])
+
+        listes = [self.trigrammes[g] for g in grams if g in self.trigrammes]
+        if not listes:
+            return np.array([], dtype=np.int32), np.array([])
+
+        communs = np.bincount(np.concatenate(listes), minlength=len(self.textes))
+        candidats = np.flatnonzero(communs >= max(1, score_min * len(grams)))
+        scores = communs[candidats] / len(grams)
+
+        # Bonus à la correspondance exacte ; à score égal, les textes les plus courts d'abord
+        exact = np.fromiter((requete in self.textes[i] for i in candidats), bool, len(candidats))
+        scores = np.minimum(1.0, scores + 0.5 * exact)
+
+        ordre = np.lexsort((self.nb_trigrammes[candidats], -scores))[:k]
+        return candidats[ordre], scores[ordre]
+
+
+def etablissements_a_indexer(etabs, communes):
+    """Une ligne par numéro FINESS, avec le nom de la commune d'implantation."""
+    noms = communes[["code_insee", "nom_standard"]]
+    etabs = etabs.drop(columns="nom_standard", errors="ignore")
+    return (
+        etabs.drop_duplicates("numero finess etablissement")
+             .merge(noms.drop_duplicates("code_insee"), on="code_insee", how="left")
+             .reset_index(drop=True)
+    )
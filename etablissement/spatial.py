@@ -0,0 +1,122 @@
+"""
+Requêtes spatiales sur les établissements : rayon, emprise, plus proches voisins.
+
+Les coordonnées sont rangées dans une grille régulière (cellules de
+`TAILLE_CELLULE` degrés) triée par identifiant de cellule. Une requête ne lit
+que les cellules qui recouvrent la zone cherchée, localisées par
+`np.searchsorted`, puis filtre les candidats par distance haversine
+vectorisée. Pas de dépendance autre que NumPy, et des temps de réponse de
+l'ordre de la milliseconde même à l'échelle nationale.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+RAYON_TERRE_KM = 6371.0088
+KM_PAR_DEGRE = RAYON_TERRE_KM * np.pi / 180  # le long d'un méridien
+TAILLE_CELLULE = 0.1  # degrés, soit ~11 km en latitude
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distance orthodromique (km) ; accepte des tableaux NumPy (degrés)."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * RAYON_TERRE_KM * np.arcsin(np.sqrt(a))
+
+
+@dataclass
+class IndexSpatial:
+    positions: np.ndarray   # position de chaque point dans le DataFrame d'origine (triées par cellule)
+    lat: np.ndarray
+    lon: np.ndarray
+    cellules: np.ndarray    # identifiant de cellule de chaque point, trié
+    taille: float
+
+    @classmethod
+    def construire(cls, df, lat="latitude", lon="longitude", taille=TAILLE_CELLULE):
+        coords = df[[lat, lon]].apply(pd.to_numeric, errors="coerce").to_numpy()
+        valide = ~np.isnan(coords).any(axis=1)
+        positions = np.flatnonzero(valide)
+        la, lo = coords[valide, 0], coords[valide, 1]
+
+        cellules = cls._cellule(la, lo, taille)
+        ordre = np.argsort(cellules, kind="stable")
+        return cls(positions[ordre], la[ordre], lo[ordre], cellules[ordre], taille)
+
+    @staticmethod
+    def _cellule(lat, lon, taille):
+        # Identifiant unique (ligne, colonne) sur la grille mondiale
+        ligne = np.floor((np.asarray(lat) + 90) / taille).astype(np.int64)
+        colonne = np.floor((np.asarray(lon) + 180) / taille).astype(np.int64)
+        return ligne * 10_000_000 + colonne
+
+    def _candidats(self, lat_min, lat_max, lon_min, lon_max):
+        """Indices (dans l'index) des points des cellules recouvrant l'emprise."""
+        # Bornes ramenées sur le globe : une colonne hors de [-180, 180] déborderait sur la ligne voisine
+        lat_min, lat_max = np.clip([lat_min, lat_max], -90, 90)
+        lon_min, lon_max = np.clip([lon_min, lon_max], -180, 180)
+        l0, c0 = divmod(int(self._cellule(lat_min, lon_min, self.taille)), 10_000_000)
+        l1, c1 = divmod(int(self._cellule(lat_max, lon_max, self.taille)), 10_000_000)
+        lignes = np.arange(l0, l1 + 1, dtype=np.int64)[:, None] * 10_000_000
+        debuts = np.searchsorted(self.cellules, lignes + c0, side="left").ravel()
+        fins = np.searchsorted(self.cellules, lignes + c1, side="right").ravel()
+        if not len(debuts):
+            return np.array([], dtype=np.int64)
+        return np.concatenate([np.arange(d, f) for d, f in zip(debuts, fins)])
+
+    def dans_emprise(self, lat_min, lat_max, lon_min, lon_max):
+        """Positions des points contenus dans une emprise (vue de carte)."""
+        i = self._candidats(lat_min, lat_max, lon_min, lon_max)
+        garde = ((self.lat[i] >= lat_min) & (self.lat[i] <= lat_max)
+                 & (self.lon[i] >= lon_min) & (self.lon[i] <= lon_max))
+        return self.positions[i[garde]]
+
+    def dans_rayon(self, lat, lon, rayon_km):
+        """Positions et distances (km) des points à moins de `rayon_km`, triés par distance."""
+        # Marge d'une cellule autour du cercle ; largeur en longitude prise à la latitude la plus polaire
+        dlat = rayon_km / KM_PAR_DEGRE + self.taille
+        cos_min = np.cos(np.radians(min(abs(lat) + dlat, 90)))
+        dlon = rayon_km / KM_PAR_DEGRE / cos_min + self.taille if cos_min > 1e-9 else np.inf
+        if lon - dlon < -180 or lon + dlon > 180:
+            # Cercle qui atteint un pôle ou l'antiméridien : toutes les longitudes
+            lon_min, lon_max = -180, 180
+        else:
+            lon_min, lon_max = lon - dlon, lon + dlon
+        i = self._candidats(lat - dlat, lat + dlat, lon_min, lon_max)
+        distances = haversine_km(lat, lon, self.lat[i], self.lon[i])
+        garde = distances <= rayon_km
+        i, distances = i[garde], distances[garde]
+        ordre = np.argsort(distances, kind="stable")
+        return self.positions[i[ordre]], distances[ordre]
+
+    def plus_proches(self, lat, lon, k=5, masque=None):
+        """
+        Les `k` points les plus proches, éventuellement restreints à ceux dont
+        `masque` (booléens alignés sur le DataFrame d'origine) est vrai.
+        """
+        i = np.arange(len(self.positions))
+        if masque is not None:
+            i = i[np.asarray(masque)[self.positions]]
+        distances = haversine_km(lat, lon, self.lat[i], self.lon[i])
+        if len(i) > k:
+            proches = np.argpartition(distances, k)[:k]
+            i, distances = i[proches], distances[proches]
+        ordre = np.argsort(distances, kind="stable")
+        return self.positions[i[ordre]], distances[ordre]
+
+
+def comptes_par_type(df, positions, colonne="type d etablissements"):
+    """Nombre d'établissements distincts par type dans une zone de chalandise."""
+    zone = df.iloc[positions]
+    return (
+        zone.drop_duplicates("numero finess etablissement")
+            .groupby(colonne)
+            .size()
+            .rename("nb_etablissements")
+            .reset_index()
+            .sort_values("nb_etablissements", ascending=False)
+    )
@@ -0,0 +1 @@
+"""Mortalité : ingestion des fichiers de décès INSEE et page de restitution."""
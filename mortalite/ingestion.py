@@ -0,0 +1,119 @@
+"""
+Ingestion en flux des fichiers de décès individuels de l'INSEE.
+
+Les fichiers `deces-AAAA.csv` comptent plusieurs millions de lignes. Ils sont
+lus par blocs de taille fixe, filtrés sur les communes d'Occitanie puis
+agrégés au fil de l'eau dans un cube commune × année × classe d'âge × sexe.
+Le cube est écrit en Parquet : la page Mortalité ne lit que lui.
+
+Usage :
+    python -m mortalite.ingestion data/raw/deces-2022.csv data/raw/deces-2023.csv
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from donnees.territoires import REGION_DEFAUT, REGIONS, departement_commune, departements_region
+
+CHEMIN_CUBE = Path("data/mortalite_cube.parquet")
+
+DEPARTEMENTS_OCCITANIE = tuple(departements_region(REGION_DEFAUT))
+
+COLONNES = ["sexe", "datenaiss", "datedeces", "lieudeces"]
+DIMENSIONS = ["code_insee", "annee", "classe_age", "sexe"]
+
+# Classes d'âge quinquennales, 95 ans et plus regroupés
+CLASSES_AGE = [f"{a}-{a + 4} ans" for a in range(0, 95, 5)] + ["95 ans et plus"]
+
+TAILLE_BLOC = 500_000
+
+
+def _agreger_bloc(bloc, departements):
+    """Filtre un bloc brut et le réduit à des effectifs par cellule du cube."""
+    lieu = bloc["lieudeces"].str.strip().str.zfill(5)
+    dep = departement_commune(lieu)
+    bloc = bloc[dep.isin(departements)]
+    if bloc.empty:
+        return None
+
+    naiss = bloc["datenaiss"].str.strip()
+    deces = bloc["datedeces"].str.strip()
+    annee_deces = pd.to_numeric(deces.str[:4], errors="coerce")
+    annee_naiss = pd.to_numeric(naiss.str[:4], errors="coerce")
+
+    # Anniversaire pas encore atteint dans l'année du décès (mois/jour "00" = inconnu)
+    pas_encore = deces.str[4:8] < naiss.str[4:8]
+    age = annee_deces - annee_naiss - pas_encore.astype(int)
+
+    valide = annee_deces.notna() & age.between(0, 125)
+    classe = np.minimum(age[valide] // 5, len(CLASSES_AGE) - 1).astype("int8")
+
+    cellules = pd.DataFrame({
+        "code_insee": lieu.loc[bloc.index][valide].values,
+        "annee": annee_deces[valide].astype("int16").values,
+        "classe_age": classe.values,
+        "sexe": pd.to_numeric(bloc["sexe"][valide], errors="coerce").fillna(0).astype("int8").values,
+    })
+    return cellules.groupby(DIMENSIONS, observed=True).size().rename("deces")
+
+
+def construire_cube(fichiers, departements=DEPARTEMENTS_OCCITANIE, taille_bloc=TAILLE_BLOC):
+    """
+    Lit les fichiers de décès par blocs et retourne le cube agrégé.
+
+    La mémoire utilisée dépend de la taille des blocs et du nombre de cellules
+    du cube, pas de la taille des fichiers bruts.
+    """
+    cube = None
+    for fichier in fichiers:
+        lecteur = pd.read_csv(
+            fichier,
+            sep=";",
+            usecols=COLONNES,
+            dtype=str,
+            chunksize=taille_bloc,
+            encoding="utf-8",
+        )
+        for bloc in lecteur:
+            partiel = _agreger_bloc(bloc.dropna(subset=["lieudeces", "datedeces"]), departements)
+            if partiel is None:
+                continue
+            cube = partiel if cube is None else cube.add(partiel, fill_value=0)
+
+    if cube is None:
+        return pd.DataFrame(columns=DIMENSIONS + ["deces"])
+
+    cube = cube.astype("int64").reset_index()
+    cube["classe_age"] = pd.Categorical.from_codes(cube["classe_age"], CLASSES_AGE, ordered=True)
+    cube["sexe"] = cube["sexe"].map({1: "Homme", 2: "Femme"}).fillna("Inconnu").astype("category")
+    cube["code_insee"] = cube["code_insee"].astype("category")
+    return cube
+
+
+def ecrire_cube(cube, chemin=CHEMIN_CUBE):
+    """Persiste le cube au format Parquet (colonnaire, compressé)."""
+    chemin = Path(chemin)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    cube.to_parquet(chemin, index=False)
+    return chemin
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construit le cube de mortalité d'une région.")
+    parser.add_argument("fichiers", nargs="+", help="fichiers deces-AAAA.csv de l'INSEE")
+    parser.add_argument("--sortie", default=str(CHEMIN_CUBE))
+    parser.add_argument("--taille-bloc", type=int, default=TAILLE_BLOC)
+    parser.add_argument("--region", default=REGION_DEFAUT, choices=sorted(REGIONS),
+                        help="code de la région à retenir (76 = Occitanie)")
+    args = parser.parse_args()
+
+    cube = construire_cube(args.fichiers, departements_region(args.region), taille_bloc=args.taille_bloc)
+    chemin = ecrire_cube(cube, args.sortie)
+    print(f"{int(cube['deces'].sum()):,} décès agrégés en {len(cube):,} cellules -> {chemin}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import streamlit as st
+import plotly.express as px
+import pandas as pd
+
+from donnees.territoires import departement_commune
+from mortalite.ingestion import CHEMIN_CUBE, CLASSES_AGE
+
+
+@st.cache_data
+def load_cube(chemin=str(CHEMIN_CUBE)):
+    return pd.read_parquet(chemin)
+
+
+def render():
+    st.set_page_config(layout="wide", page_title="Mortalité Occitanie")
+    st.title("☠️ Mortalité en Occitanie")
+
+    # ─── CHARGEMENT DU CUBE ───────────────────────────────────────────
+    if not CHEMIN_CUBE.exists():
+        st.info(
+            "Le cube de mortalité n'est pas encore construit. "
+            "Lancez `python -m mortalite.ingestion data/raw/deces-*.csv` "
+            "avec les fichiers de décès de l'INSEE."
+        )
+        return
+
+    cube = load_cube()
+    cube["dep_code"] = departement_commune(cube["code_insee"]).to_numpy()
+
+    annees = sorted(cube["annee"].unique())
+    departements = sorted(cube["dep_code"].unique())
+
+    option_tous_deps = "Tous les départements"
+    selection_deps = st.multiselect(
+        "Sélectionner un ou plusieurs départements :",
+        [option_tous_deps] + departements,
+        default=[option_tous_deps],
+        key="filtre_departements_mortalite"
+    )
+
+    df = cube
+    if option_tous_deps not in selection_deps:
+        df = df[df["dep_code"].isin(selection_deps)]
+
+    # --- KPI ---
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Décès recensés", f"{int(df['deces'].sum()):,}")
+    col2.metric("Années couvertes", f"{annees[0]}–{annees[-1]}" if annees else "N/A")
+    col3.metric("Communes concernées", f"{df['code_insee'].nunique()}")
+
+    # --- Évolution annuelle ---
+    st.subheader("Évolution annuelle des décès")
+    par_annee = df.groupby(["annee", "sexe"], observed=True)["deces"].sum().reset_index()
+    fig = px.line(
+        par_annee,
+        x="annee",
+        y="deces",
+        color="sexe",
+        markers=True,
+        labels={"annee": "Année", "deces": "Décès", "sexe": "Sexe"},
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    # --- Pyramide des âges au décès ---
+    st.subheader("Décès par classe d'âge et sexe")
+    annee = st.selectbox("Année", annees[::-1], key="annee_mortalite")
+    pyramide = (
+        df[df["annee"] == annee]
+        .groupby(["classe_age", "sexe"], observed=False)["deces"].sum()
+        .reset_index()
+    )
+    pyramide.loc[pyramide["sexe"] == "Homme", "deces"] *= -1
+
+    fig_age = px.bar(
+        pyramide,
+        x="deces",
+        y="classe_age",
+        color="sexe",
+        orientation="h",
+        category_orders={"classe_age": CLASSES_AGE[::-1]},
+        labels={"deces": "Décès", "classe_age": "Classe d'âge", "sexe": "Sexe"},
+        height=650,
+    )
+    fig_age.update_layout(barmode="relative")
+    st.plotly_chart(fig_age, use_container_width=True)
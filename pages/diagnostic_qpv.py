@@ -7,6 +7,11 @@ import seaborn as sns
 import pandas as pd
 
 from etablissement.utils import load_data, build_carte
+from donnees.qualite import ecrire_rapport, valider
+from donnees.stockage import charger, version_sources
+from donnees.telechargement import bouton_export
+from donnees.territoires import REGION_DEFAUT
+from qpv.indicateurs import NIVEAUX, calculer_indicateurs, table_iris, territoires_avec_qpv
 
 
 def main():
@@ -34,22 +39,36 @@ def main():
     # 📌 FONCTIONS INTERNES
     # -------------------------------------------------------------------------
     @st.cache_data
-    def compute_indicators(_df):  # underscore = évite erreur hash GeoDataFrame
-        df = _df.copy()
+    def compute_indicators(iris, variables, niveau="commune"):
+        # Table sans géométrie : hashable par Streamlit, cache par jeu de variables
+        return calculer_indicateurs(iris, variables, niveau)
 
-        qpv = df[df["is_qpv"] == 1]
-        hors = df[df["is_qpv"] == 0]
-
-        revenu_qpv = qpv["revenu_median"].median()
-        revenu_hors = hors["revenu_median"].median()
+    @st.cache_data
+    def load_iris():
+        # Contrôle qualité une fois au chargement : IRIS sans revenu exclus, indicateur QPV typé
+        iris, rapport = valider("iris", load_data())
+        ecrire_rapport(rapport)
+        return iris
 
+    @st.cache_data
+    def load_communes(region):
+        # Rattachement commune -> EPCI, à défaut tiré du jeu des distances
+        colonnes = ["code_insee", "epci_code", "epci_nom"]
+        try:
+            return charger("communes", regions=[region], colonnes=colonnes)
+        except FileNotFoundError:
+            return charger("distances", regions=[region], colonnes=colonnes)
+
+    def indicateurs_territoire(table, colonne, code):
+        ligne = table[table[colonne] == code].iloc[0]
+        ligne = ligne.astype(object).where(ligne.notna(), None)
         return {
-            "nb_qpv": qpv.shape[0],
-            "nb_iris": df.shape[0],
-            "revenu_qpv": revenu_qpv,
-            "revenu_hors": revenu_hors,
-            "ecart": revenu_hors - revenu_qpv if revenu_qpv and revenu_hors else None,
-            "ratio": round(revenu_qpv / revenu_hors, 2) if revenu_hors and revenu_hors > 0 else None
+            "nb_qpv": int(ligne["nb_qpv"]),
+            "nb_iris": int(ligne["nb_iris"]),
+            "revenu_qpv": ligne.get("revenu_median_q50_qpv"),
+            "revenu_hors": ligne.get("revenu_median_q50_hors"),
+            "ecart": ligne.get("revenu_median_ecart"),
+            "ratio": ligne.get("revenu_median_ratio"),
         }
 
     # -------------------------------------------------------------------------
@@ -69,8 +88,34 @@ def main():
     # -------------------------------------------------------------------------
     # 📥 CHARGEMENT DES DONNÉES
     # -------------------------------------------------------------------------
-    iris_tlse = load_data()
-    iris_tlse = iris_tlse.dropna(subset=["revenu_median"])
+    iris_tlse = load_iris()
+    iris_table = table_iris(iris_tlse, load_communes(REGION_DEFAUT))
+
+    # -------------------------------------------------------------------------
+    # 📍 TERRITOIRE (appliqué à tous les onglets)
+    # -------------------------------------------------------------------------
+    niveaux = [n for n in ("commune", "epci") if set(NIVEAUX[n]) <= set(iris_table.columns)]
+    col1, col2 = st.columns([1, 2])
+    niveau = col1.radio(
+        "Niveau",
+        niveaux,
+        format_func={"commune": "Commune", "epci": "EPCI"}.get,
+        horizontal=True,
+        key="niveau_qpv"
+    )
+    colonne_code, colonne_nom = NIVEAUX[niveau]
+    territoires = territoires_avec_qpv(iris_table, niveau)
+    noms_territoires = dict(zip(territoires[colonne_code], territoires[colonne_nom]))
+    codes_territoires = list(noms_territoires)
+    code_territoire = col2.selectbox(
+        "Territoire",
+        codes_territoires,
+        index=codes_territoires.index("31555") if "31555" in codes_territoires else 0,
+        format_func=lambda c: noms_territoires[c],
+        key="territoire_qpv"
+    )
+    # Table IRIS et GeoDataFrame alignés ligne à ligne
+    iris_sel = iris_tlse[(iris_table[colonne_code] == code_territoire).to_numpy()]
 
     # -------------------------------------------------------------------------
     # 🧩 ONGLET
@@ -87,7 +132,7 @@ def main():
     # -------------------------------------------------------------------------
     with tab1:
         st.subheader("🗺️ Carte interactive des QPV")
-        m = build_carte(iris_tlse)
+        m = build_carte(iris_sel)
         st_folium(m, width=1000, height=650)
 
     # -------------------------------------------------------------------------
@@ -96,7 +141,8 @@ def main():
     with tab2:
         st.subheader("📊 Indicateurs clés")
 
-        ind = compute_indicators(iris_tlse)
+        table_ind = compute_indicators(iris_table, ("revenu_median",), niveau)
+        ind = indicateurs_territoire(table_ind, colonne_code, code_territoire)
 
         col1, col2, col3 = st.columns(3)
         col1.metric("Nombre de QPV", ind["nb_qpv"])
@@ -125,7 +171,7 @@ def main():
         with colA:
             st.write("Distribution du revenu médian")
             fig, ax = plt.subplots(figsize=(6, 4))
-            sns.histplot(iris_tlse["revenu_median"], kde=True, ax=ax)
+            sns.histplot(iris_sel["revenu_median"], kde=True, ax=ax)
             ax.set_xlabel("Revenu médian (€)")
             st.pyplot(fig)
 
@@ -134,7 +180,7 @@ def main():
             st.write("Revenu médian : QPV vs hors QPV")
             fig, ax = plt.subplots(figsize=(6, 4))
             sns.boxplot(
-                data=iris_tlse,
+                data=iris_sel,
                 x="is_qpv",
                 y="revenu_median",
                 ax=ax
@@ -145,7 +191,7 @@ def main():
 
         # Bar chart QPV
         st.write("Revenu médian par quartier QPV")
-        qpv = iris_tlse[iris_tlse["is_qpv"] == 1][["NOM_IRIS", "revenu_median"]]
+        qpv = iris_sel[iris_sel["is_qpv"] == 1][["NOM_IRIS", "revenu_median"]]
         qpv = qpv.sort_values("revenu_median")
 
         fig, ax = plt.subplots(figsize=(10, 7))
@@ -164,7 +210,7 @@ def main():
             ["Tous", "QPV", "Hors QPV"]
         )
 
-        df = iris_tlse.copy()
+        df = iris_sel.copy()
 
         if filtre == "QPV":
             df = df[df["is_qpv"] == 1]
@@ -176,12 +222,8 @@ def main():
             hide_index=True
         )
 
-        st.download_button(
-            "📥 Télécharger les données",
-            data=df.to_csv(index=False),
-            file_name="iris_toulouse.csv",
-            mime="text/csv"
-        )
+        # Fichier généré uniquement au clic, en cache par version des données, territoire, filtre et format
+        bouton_export(df, f"iris_{code_territoire}", (version_sources(), niveau, code_territoire, filtre), key="iris")
 
 
 if __name__ == "__main__":
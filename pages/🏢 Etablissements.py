@@ -1,64 +1,146 @@
 import streamlit as st
 import plotly.express as px
-import pandas as pd
 
+from donnees.requetes import distance_moyenne_par, typologie
+from donnees.selection import selection_region
+from donnees.stockage import charger, kpis_nationaux, regions_disponibles, version_sources
+from donnees.telechargement import bouton_export
+from donnees.territoires import EMPRISES_REGIONS, REGION_DEFAUT, REGIONS
+from donnees.instantane import kpis_epci, kpis_epci_par_nom, kpis_regions, lire_instantane
+from etablissement.recherche import IndexTrigrammes, etablissements_a_indexer
+from etablissement.cartes import carte_points, point_selectionne
+from etablissement.spatial import IndexSpatial, comptes_par_type
 
-st.set_page_config(layout="wide", page_title="Dashboard Santé Occitanie")
 
-# ─── CHARGEMENT DONNÉES ───────────────────────────────────────────
-df = pd.read_csv("data/finess_occitanie2.csv", dtype={"departement": str})
-df_distances = pd.read_csv("data/distances_communes_urgence_occitanie.csv")
-df_communes = pd.read_csv("data/communes-france-2025.csv", sep=",", encoding="utf-8")
-df_communes_occitanie = df_communes[df_communes['reg_nom'] == 'Occitanie']
-df_urgences = df[df['libelle activite'].str.contains("urgence", case=False, na=False)]
-df_join = pd.read_csv("data/finess_occitanie_join.csv")
-df['longitude'] = df['longitude'].astype(float)
-df['latitude'] = df['latitude'].astype(float)
-#Sélectionne uniquement les données de la métropole de Toulouse
-df_toulouse = df_join[df_join['epci_nom'] == 'Toulouse Métropole']
-df_cc = df_join[df_join['epci_nom'] == 'CC Pyrénées Audoises']
+st.set_page_config(layout="wide", page_title="Dashboard Santé")
+
+
+@st.cache_data
+def load_region(jeu, region):
+    # Ne lit que les partitions de la région sélectionnée
+    return charger(jeu, regions=[region])
+
+
+@st.cache_resource
+def load_index_recherche(_etablissements, _communes, region, version):
+    # Index partagé entre toutes les sessions, reconstruit seulement si les données changent
+    etabs = etablissements_a_indexer(_etablissements, _communes)
+    return etabs, IndexTrigrammes.construire(etabs)
+
+
+@st.cache_resource
+def load_index_spatial(_etablissements, region, version):
+    return IndexSpatial.construire(_etablissements)
+
+
+COLONNES_FICHE = ["raison_sociale", "type d etablissements", "libelle activite", "code_insee", "nom_standard", "distance_urgence_km", "distance_km"]
+
+
+def afficher_fiche(evenement, positions, donnees):
+    # Détail d'un point chargé au clic plutôt qu'envoyé avec chaque point de la carte
+    lignes = point_selectionne(evenement, positions)
+    if lignes is None:
+        st.caption("Cliquez sur un point de la carte pour afficher sa fiche.")
+        return
+    # Un point regroupe toutes les lignes (activités, établissements) de sa position
+    colonnes = [c for c in COLONNES_FICHE if c in donnees.columns]
+    st.dataframe(donnees.iloc[lignes][colonnes], use_container_width=True, hide_index=True)
+
+
+@st.cache_data
+def load_kpis(region, version):
+    # Repli quand l'instantané est absent ou périmé : seules les colonnes utiles sont lues
+    return {
+        "france": kpis_nationaux(),
+        "regions": kpis_regions([region]),
+        "epci": kpis_epci([REGION_DEFAUT]),
+    }
+
+
+@st.cache_data
+def load_kpis_epci(version):
+    # Repli pour un EPCI absent de l'instantané : indicateurs recalculés sur les données actuelles
+    return {"epci": kpis_epci([REGION_DEFAUT])}
+
+
+def centre_carte(donnees, region):
+    # Coordonnées hors emprise neutralisées à l'ingestion : centre des points localisés,
+    # à défaut centre de l'emprise de la région
+    if donnees[['latitude', 'longitude']].notna().all(axis=1).any():
+        return donnees['latitude'].mean(), donnees['longitude'].mean()
+    lat_min, lat_max, lon_min, lon_max = EMPRISES_REGIONS[region]
+    return (lat_min + lat_max) / 2, (lon_min + lon_max) / 2
+
+
+def afficher_kpis_epci(kpis, nom):
+    if kpis is None:
+        st.info(f"Indicateurs clés indisponibles : {nom} est absent des données chargées.")
+        return
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Établissements recensés", f"{kpis['total_etabs']}")
+    col2.metric("Types d’établissements", f"{kpis['nb_types']}")
+    col3.metric("Communes couvertes", f"{kpis['nb_communes']}")
+    col4.metric("Nb de personnes par établissement", f"{kpis['personnes_par_etab']: .0f}")
+
+
+# ─── INDICATEURS CLÉS (INSTANTANÉ) ────────────────────────────────
+# Les chiffres d'en-tête s'affichent avant le chargement des jeux complets
+instantane = lire_instantane()
+region = selection_region(
+    instantane["france"]["regions"] if instantane else regions_disponibles("etablissements")
+)
+nom_region = REGIONS[region]
+version_donnees = version_sources()
+if instantane is None:
+    instantane = load_kpis(region, version_donnees)
+kpis_region = instantane["regions"][region]
 
 
 # ─── ONGLET PRINCIPAL ─────────────────────────────────────────────
-tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["🏥 Vue d’ensemble", "📍 Établissements", "🩺 Soins",  "🚑 Distances aux urgences", "🌇 Métropôle de Toulouse", "🐄 CC Pyrénées Audoises"
+tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["🏥 Vue d’ensemble", "📍 Établissements", "🩺 Soins",  "🚑 Distances aux urgences", "🌇 Métropôle de Toulouse", "🐄 CC Pyrénées Audoises", "🧭 Autour d'une commune"
 ])
 
 # =================================================================
 # 🟦 ONGLET 1 — KPI + TYPOLOGIES
 # =================================================================
 with tab1:
-    st.header("Vue d’ensemble des établissements de santé en Occitanie")
+    st.header(f"Vue d’ensemble des établissements de santé en {nom_region}")
 
     # --- KPI ---
-    total_etabs = df['numero finess etablissement'].nunique()
-    nb_types = df['type d etablissements'].nunique()
-    nb_deps = df['departement'].nunique()
+    total_etabs = kpis_region['total_etabs']
+    nb_types = kpis_region['nb_types']
+    nb_deps = kpis_region['nb_deps']
+    population_region = kpis_region['population']
 
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("Établissements recensés", f"{total_etabs}")
     col2.metric("Types d’établissements", f"{nb_types}")
     col3.metric("Départements couverts", f"{nb_deps}")
-    col4.metric("Nb de personnes par établissement", f"{df_communes_occitanie['population'].sum()/df['numero finess etablissement'].nunique(): .0f}")
-
-    col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Établissements recensés en France", f"102553")
-    col2.metric("Types d’établissements", f"{nb_types}")
-    col3.metric("Départements couverts en France", f"106")
-    col4.metric("Nb de personnes par établissement en France", f"673")
-
-    st.markdown(f"""
+    col4.metric("Nb de personnes par établissement", f"{kpis_region['personnes_par_etab']: .0f}")
+
+    # --- KPI nationaux, calculés sur toutes les partitions disponibles ---
+    kpis_fr = instantane["france"]
+    if len(kpis_fr["regions"]) > 1:
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Établissements recensés en France", f"{kpis_fr['total_etabs']}")
+        col2.metric("Types d’établissements", f"{kpis_fr['nb_types']}")
+        col3.metric("Départements couverts en France", f"{kpis_fr['nb_deps']}")
+        col4.metric("Nb de personnes par établissement en France", f"{kpis_fr['personnes_par_etab']: .0f}")
+
+        st.markdown(f"""
+                ### 📍 Informations clés
+    La région {nom_region} représente {round(total_etabs/kpis_fr['total_etabs']*100, 2)} % des établissements de santé en France.
+    Avec une population d'environ {population_region:,} habitants, soit {round(population_region/kpis_fr['population']*100, 2)} % de la population française.Cela correspond à environ {round(population_region/total_etabs):,} personnes par établissement.""")
+    else:
+        st.markdown(f"""
                 ### 📍 Informations clés
-    L'occitanie représente {round(total_etabs/102553*100, 2)} % des établissements de santé en France.
-    Avec une population d'environ {df_communes_occitanie['population'].sum():,} habitants, soit 11,47% de la population française.Cela correspond à environ {round(df_communes_occitanie['population'].sum()/total_etabs):,} personnes par établissement.""")
+    Avec une population d'environ {population_region:,} habitants, la région {nom_region} compte environ {round(population_region/total_etabs):,} personnes par établissement.""")
+        st.caption("Comparaison nationale indisponible : seules les données de cette région sont chargées "
+                   "(voir `python -m donnees.stockage`).")
     st.subheader("Typologie des établissements")
 
-    table_typo = (
-        df.groupby('type d etablissements')
-          .agg(nb_etablissements=('numero finess etablissement', 'count'))
-          .reset_index()
-    )
+    table_typo = typologie(regions=[region])
     table_typo['pourcentage'] = (table_typo['nb_etablissements'] / total_etabs * 100).round(2)
-    table_typo = table_typo.sort_values('nb_etablissements', ascending=False)
 
     st.dataframe(table_typo, use_container_width=True, hide_index=True)
 
@@ -71,12 +153,71 @@ with tab1:
     )
     st.plotly_chart(fig_typo, use_container_width=True)
 
+kpis_toulouse = (kpis_epci_par_nom(instantane, 'Toulouse Métropole')
+                 or kpis_epci_par_nom(load_kpis_epci(version_donnees), 'Toulouse Métropole'))
+kpis_cc = (kpis_epci_par_nom(instantane, 'CC Pyrénées Audoises')
+           or kpis_epci_par_nom(load_kpis_epci(version_donnees), 'CC Pyrénées Audoises'))
+
+with tab5:
+    st.header("Métropôle de Toulouse")
+    afficher_kpis_epci(kpis_toulouse, 'Toulouse Métropole')
+
+with tab6:
+    st.header("🐄 CC Pyrénées Audoises")
+    afficher_kpis_epci(kpis_cc, 'CC Pyrénées Audoises')
+
+with tab4:
+    st.header("Distance aux services d’urgence")
+    st.metric(
+        "Distance moyenne au service d’urgence le plus proche",
+        f"{kpis_region['distance_urgence_moyenne']:.1f} km"
+    )
+
+
+# ─── CHARGEMENT DONNÉES ───────────────────────────────────────────
+df = load_region("etablissements", region)
+df_distances = load_region("distances", region)
+df_communes_region = load_region("communes", region)
+df_urgences = df[df['libelle activite'].str.contains("urgence", case=False)]
+
+# Les onglets Toulouse et CC Pyrénées Audoises portent sur des EPCI d'Occitanie
+df_join = load_region("etablissements_communes", REGION_DEFAUT)
+df_communes_occitanie = load_region("communes", REGION_DEFAUT)
+#Sélectionne uniquement les données de la métropole de Toulouse
+df_toulouse = df_join[df_join['epci_nom'] == 'Toulouse Métropole']
+df_cc = df_join[df_join['epci_nom'] == 'CC Pyrénées Audoises']
+
+
 # =================================================================
 # 🟩 ONGLET 2 — CARTE PAR TYPE D'ÉTABLISSEMENT
 # =================================================================
 with tab2:
     st.header("Carte interactive des établissements de santé")
 
+    # --- Recherche d'un établissement ---
+    etabs_recherche, index_recherche = load_index_recherche(df, df_communes_region, region, version_donnees)
+
+    requete = st.text_input(
+        "🔎 Rechercher un établissement (nom, commune ou numéro FINESS) :",
+        key="recherche_etablissement"
+    )
+    etab_trouve = None
+    if requete:
+        positions, _ = index_recherche.rechercher(requete, k=10)
+        if len(positions):
+            resultats = etabs_recherche.iloc[positions]
+            choix = st.selectbox(
+                "Résultats",
+                range(len(resultats)),
+                format_func=lambda i: f"{resultats['raison_sociale'].iloc[i]} – "
+                                      f"{resultats['nom_standard'].fillna('').iloc[i]} "
+                                      f"({resultats['numero finess etablissement'].iloc[i]})",
+                key="resultat_recherche"
+            )
+            etab_trouve = resultats.iloc[choix]
+        else:
+            st.caption("Aucun établissement ne correspond à cette recherche.")
+
     groupes = sorted(df['type d etablissements'].dropna().unique())
     departements = sorted(df['departement'].dropna().unique())
 
@@ -105,30 +246,47 @@ with tab2:
     if option_tous_deps not in selection_deps:
         df_filtre = df_filtre[df_filtre['departement'].isin(selection_deps)]
 
-    if not df_filtre.empty:
-        center_lat = df_filtre['latitude'].mean()
-        center_lon = df_filtre['longitude'].mean()
+    zoom = 6
+    if etab_trouve is not None and etab_trouve[['latitude', 'longitude']].isna().any():
+        st.caption("Cet établissement n'a pas de coordonnées valides : il n'apparaît pas sur la carte.")
+        etab_trouve = None
+    if etab_trouve is not None:
+        # Carte centrée sur l'établissement trouvé
+        center_lat = float(etab_trouve['latitude'])
+        center_lon = float(etab_trouve['longitude'])
+        zoom = 14
     else:
-        center_lat, center_lon = 46.5, 2.5
+        center_lat, center_lon = centre_carte(df_filtre, region)
 
-    fig = px.scatter_map(
+    fig, positions = carte_points(
         df_filtre,
-        lat="latitude",
-        lon="longitude",
-        hover_name="raison_sociale",
-        hover_data={"type d etablissements": True},
-        color="type d etablissements",
-        zoom=6,
+        couleur="type d etablissements",
+        survol="raison_sociale",
+        zoom=zoom,
         height=650
     )
 
-    fig.update_layout(
-        map_style="open-street-map",
-        map_center={"lat": center_lat, "lon": center_lon},
-        margin={"r":0, "t":0, "l":0, "b":0}
-    )
+    if etab_trouve is not None:
+        fig.add_scattermap(
+            lat=[center_lat],
+            lon=[center_lon],
+            mode="markers",
+            marker=dict(size=18, color="red"),
+            name="Établissement recherché",
+            hovertext=[etab_trouve['raison_sociale']]
+        )
+
+    fig.update_layout(map_center={"lat": center_lat, "lon": center_lon})
 
-    st.plotly_chart(fig, use_container_width=True)
+    evenement = st.plotly_chart(fig, use_container_width=True, on_select="rerun", selection_mode="points", key="carte_etablissements")
+    afficher_fiche(evenement, positions, df_filtre)
+
+    bouton_export(
+        df_filtre,
+        "etablissements",
+        (version_donnees, region, tuple(selection_groupes), tuple(selection_deps)),
+        key="etablissements"
+    )
 
 # =================================================================
 # 🟧 ONGLET 3 — CARTE PAR TYPE DE SOIN
@@ -173,49 +331,36 @@ with tab3:
     if option_tous_deps2 not in selection_deps2:
         df_filtre2 = df_filtre2[df_filtre2['departement'].isin(selection_deps2)]
 
-    if not df_filtre2.empty:
-        center_lat = df_filtre2['latitude'].mean()
-        center_lon = df_filtre2['longitude'].mean()
-    else:
-        center_lat, center_lon = 46.5, 2.5
+    center_lat, center_lon = centre_carte(df_filtre2, region)
 
-    fig2 = px.scatter_map(
+    fig2, positions2 = carte_points(
         df_filtre2,
-        lat="latitude",
-        lon="longitude",
-        hover_name="raison_sociale",
-        hover_data={"type d etablissements": True},
-        color="libelle activite",
+        couleur="libelle activite",
+        survol="raison_sociale",
         zoom=6,
         height=650
     )
 
-    fig2.update_layout(
-        map_style="open-street-map",
-        map_center={"lat": center_lat, "lon": center_lon},
-        margin={"r":0, "t":0, "l":0, "b":0}
-    )
+    fig2.update_layout(map_center={"lat": center_lat, "lon": center_lon})
 
-    st.plotly_chart(fig2, use_container_width=True)
+    evenement2 = st.plotly_chart(fig2, use_container_width=True, on_select="rerun", selection_mode="points", key="carte_soins")
+    afficher_fiche(evenement2, positions2, df_filtre2)
+
+    bouton_export(
+        df_filtre2,
+        "soins",
+        (version_donnees, region, tuple(selection_soins), tuple(selection_deps2)),
+        key="soins"
+    )
 
 # =================================================================
 # 🟧 ONGLET 4 — SERVICES D URGENCE
 # =================================================================
 
 with tab4:
-    st.header("Distance aux services d’urgence")
-
     # Charger les distances calculées dans le notebook
     df_dist = df_distances.copy()
 
-    # KPI distance moyenne
-    distance_moyenne = df_dist["distance_urgence_km"].mean()
-
-    st.metric(
-        "Distance moyenne au service d’urgence le plus proche",
-        f"{distance_moyenne:.1f} km"
-    )
-
     # Tableau complet
     st.subheader("Distances par commune")
 
@@ -232,6 +377,8 @@ with tab4:
 
     st.dataframe(df_final, use_container_width=True)
 
+    bouton_export(df_final, "distances_urgences", (version_donnees, region), key="distances")
+
 
 
 
@@ -241,13 +388,7 @@ with tab4:
         st.subheader("Distance moyenne par département")
     # Distance moyenne par département
         
-        distance_par_dep = (
-            df_dist
-            .groupby('dep_nom')['distance_urgence_km']
-            .mean()
-            .reset_index()
-            .sort_values('distance_urgence_km')
-        )
+        distance_par_dep = distance_moyenne_par('dep_nom', regions=[region])
 
         st.dataframe(distance_par_dep, use_container_width=True, hide_index=True)
     
@@ -256,13 +397,7 @@ with tab4:
         col2.subheader("Distance moyenne par densité de population")
         # Distance moyenne par densité de population
 
-        distance_par_dep = (
-           df_dist 
-            .groupby('grille_densite_texte')['distance_urgence_km']
-            .mean()
-            .reset_index()
-            .sort_values('distance_urgence_km')
-        )
+        distance_par_dep = distance_moyenne_par('grille_densite_texte', regions=[region])
 
   
         st.dataframe(distance_par_dep, use_container_width=True, hide_index=True)
@@ -292,15 +427,14 @@ with tab4:
     st.header("Carte des communes et des centres d’urgence")
 
     # --- Carte Plotly ---
-    fig = px.scatter_map(
+    fig, positions_communes = carte_points(
         df_distances,
         lat="latitude_centre",
         lon="longitude_centre",
-        hover_name="nom_standard",
-        hover_data={"dep_nom": True, "distance_urgence_km": True},
-        color="distance_urgence_km",   # 🔥 coloration selon la distance
-        color_continuous_scale="Viridis",  # ou "Turbo", "Plasma", "Inferno"
-
+        couleur="distance_urgence_km",   # 🔥 coloration selon la distance
+        continue_=True,
+        echelle="Viridis",  # ou "Turbo", "Plasma", "Inferno"
+        survol="nom_standard",
         zoom=6,
         height=700
     )
@@ -315,12 +449,10 @@ with tab4:
         hovertext=df_urgences["raison_sociale"]
     )
 
-    fig.update_layout(
-        map_style="open-street-map",
-        margin={"r":0, "t":0, "l":0, "b":0}
-    )
+    fig.update_layout(map_center={"lat": df_distances["latitude_centre"].mean(), "lon": df_distances["longitude_centre"].mean()})
 
-    st.plotly_chart(fig, use_container_width=True)
+    evenement = st.plotly_chart(fig, use_container_width=True, on_select="rerun", selection_mode="points", key="carte_distances")
+    afficher_fiche(evenement, positions_communes, df_distances)
 
 
 
@@ -329,32 +461,14 @@ with tab4:
 # =================================================================
 
 with tab5:
-    st.header("Métropôle de Toulouse")
     df_communes_met_toulouse = df_communes_occitanie[df_communes_occitanie['epci_nom'] == 'Toulouse Métropole']
     print('Population de la métropole de Toulouse :', df_communes_met_toulouse['population'].sum())
 
-
-
-    # --- KPI ---
-    total_etabs = df_toulouse['numero finess etablissement'].nunique()
-    nb_types = df_toulouse['type d etablissements'].nunique()
-    nb_communes = df_communes_met_toulouse['nom_standard'].nunique()
-
-    col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Établissements recensés", f"{total_etabs}")
-    col2.metric("Types d’établissements", f"{nb_types}")
-    col3.metric("Communes couvertes", f"{nb_communes}")
-    col4.metric("Nb de personnes par établissement", f"{df_communes_met_toulouse['population'].sum()/df_toulouse['numero finess etablissement'].nunique(): .0f}")
-
     st.subheader("Typologie des établissements de Toulouse")
 
-    table_typo = (
-        df_toulouse.groupby('type d etablissements')
-          .agg(nb_etablissements=('numero finess etablissement', 'count'))
-          .reset_index()
-    )
+    table_typo = typologie('etablissements_communes', regions=[REGION_DEFAUT], epci_nom='Toulouse Métropole')
+    total_etabs = kpis_toulouse['total_etabs'] if kpis_toulouse else table_typo['nb_etablissements'].sum()
     table_typo['pourcentage'] = (table_typo['nb_etablissements'] / total_etabs * 100).round(2)
-    table_typo = table_typo.sort_values('nb_etablissements', ascending=False)
 
     st.dataframe(table_typo, use_container_width=True, hide_index=True)
 
@@ -402,56 +516,32 @@ with tab5:
     zoom_level = 13
 
 
-    fig = px.scatter_map(
+    fig, positions = carte_points(
         df_filtre_toulouse,
-        lat="latitude",
-        lon="longitude",
-        hover_name="raison_sociale",
-        hover_data={"type d etablissements": True},
-        color="type d etablissements",
+        couleur="type d etablissements",
+        survol="raison_sociale",
         zoom=6,
         height=650
     )
 
-    fig.update_layout(
-        map_style="open-street-map",
-        map_center={"lat": center_lat, "lon": center_lon},
-        margin={"r":0, "t":0, "l":0, "b":0}
-    )
+    fig.update_layout(map_center={"lat": center_lat, "lon": center_lon})
 
-    st.plotly_chart(fig, use_container_width=True)
+    evenement = st.plotly_chart(fig, use_container_width=True, on_select="rerun", selection_mode="points", key="carte_toulouse")
+    afficher_fiche(evenement, positions, df_filtre_toulouse)
 
 # =================================================================
 # 🟧 ONGLET 6 — CC PYRENEES AUDOISES
 # =================================================================
 
 with tab6:
-    st.header("🐄 CC Pyrénées Audoises")
     df_communes_met_cc = df_communes_occitanie[df_communes_occitanie['epci_nom'] == 'CC Pyrénées Audoises']
     print('Population de la CC Pyrénées Audoises :', df_communes_met_cc['population'].sum())
 
-
-
-    # --- KPI ---
-    total_etabs = df_cc['numero finess etablissement'].nunique()
-    nb_types = df_cc['type d etablissements'].nunique()
-    nb_communes = df_communes_met_cc['nom_standard'].nunique()
-
-    col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Établissements recensés", f"{total_etabs}")
-    col2.metric("Types d’établissements", f"{nb_types}")
-    col3.metric("Communes couvertes", f"{nb_communes}")
-    col4.metric("Nb de personnes par établissement", f"{df_communes_met_cc['population'].sum()/df_cc['numero finess etablissement'].nunique(): .0f}")
-
     st.subheader("Typologie des établissements de la CC Pyrénées Audoises")
 
-    table_typo_cc = (
-        df_cc.groupby('type d etablissements')
-          .agg(nb_etablissements=('numero finess etablissement', 'count'))
-          .reset_index()
-    )
+    table_typo_cc = typologie('etablissements_communes', regions=[REGION_DEFAUT], epci_nom='CC Pyrénées Audoises')
+    total_etabs = kpis_cc['total_etabs'] if kpis_cc else table_typo_cc['nb_etablissements'].sum()
     table_typo_cc['pourcentage'] = (table_typo_cc['nb_etablissements'] / total_etabs * 100).round(2)
-    table_typo_cc = table_typo_cc.sort_values('nb_etablissements', ascending=False)
 
     st.dataframe(table_typo_cc, use_container_width=True, hide_index=True)
 
@@ -500,22 +590,93 @@ with tab6:
     zoom_level = 13
 
 
-    fig = px.scatter_map(
+    fig, positions = carte_points(
         df_filtre_cc,
-        lat="latitude",
-        lon="longitude",
-        hover_name="raison_sociale",
-        hover_data={"type d etablissements": True},
-        color="type d etablissements",
+        couleur="type d etablissements",
+        survol="raison_sociale",
         zoom=6,
         height=650
     )
 
-    fig.update_layout(
-        map_style="open-street-map",
-        map_center={"lat": center_lat, "lon": center_lon},
-        margin={"r":0, "t":0, "l":0, "b":0}
+    fig.update_layout(map_center={"lat": center_lat, "lon": center_lon})
+
+    evenement = st.plotly_chart(fig, use_container_width=True, on_select="rerun", selection_mode="points", key="carte_cc")
+    afficher_fiche(evenement, positions, df_filtre_cc)
+
+# =================================================================
+# 🟧 ONGLET 7 — AUTOUR D'UNE COMMUNE
+# =================================================================
+
+with tab7:
+    st.header("Établissements autour d'une commune")
+
+    index_spatial = load_index_spatial(df, region, version_donnees)
+
+    communes_geo = (
+        df_communes_region
+        .dropna(subset=["latitude_centre", "longitude_centre"])
+        .sort_values("nom_standard")
     )
+    noms_communes = dict(zip(communes_geo["code_insee"], communes_geo["nom_standard"]))
 
-    st.plotly_chart(fig, use_container_width=True)
+    col1, col2 = st.columns(2)
+    code_commune = col1.selectbox(
+        "Commune",
+        list(noms_communes),
+        format_func=noms_communes.get,
+        key="commune_rayon"
+    )
+    rayon_km = col2.slider("Rayon (km)", 1, 100, 20, key="rayon_km")
+
+    commune = communes_geo[communes_geo["code_insee"] == code_commune].iloc[0]
+    lat_commune = float(commune["latitude_centre"])
+    lon_commune = float(commune["longitude_centre"])
+
+    positions, distances = index_spatial.dans_rayon(lat_commune, lon_commune, rayon_km)
+    df_zone = df.iloc[positions].assign(distance_km=distances.round(1))
+
+    col1, col2 = st.columns(2)
+    col1.metric(f"Établissements à moins de {rayon_km} km", f"{df_zone['numero finess etablissement'].nunique()}")
+    col2.metric("Types d’établissements", f"{df_zone['type d etablissements'].nunique()}")
+
+    st.dataframe(comptes_par_type(df, positions), use_container_width=True, hide_index=True)
+
+    # --- Plus proches établissements d'un type donné ---
+    type_proche = st.selectbox(
+        "Établissements les plus proches du type :",
+        sorted(df['type d etablissements'].dropna().unique()),
+        key="type_plus_proche"
+    )
+    etabs_uniques = ~df.duplicated("numero finess etablissement")
+    positions_k, distances_k = index_spatial.plus_proches(
+        lat_commune,
+        lon_commune,
+        k=5,
+        masque=((df['type d etablissements'] == type_proche) & etabs_uniques).to_numpy()
+    )
+    st.dataframe(
+        df.iloc[positions_k][["raison_sociale", "libelle activite", "code_insee"]]
+          .assign(distance_km=distances_k.round(1)),
+        use_container_width=True,
+        hide_index=True
+    )
+
+    df_zone = df_zone.drop_duplicates("numero finess etablissement")
+    fig, positions_zone = carte_points(
+        df_zone,
+        couleur="type d etablissements",
+        survol="raison_sociale",
+        zoom=9,
+        height=650
+    )
+    fig.add_scattermap(
+        lat=[lat_commune],
+        lon=[lon_commune],
+        mode="markers",
+        marker=dict(size=16, color="black"),
+        name=noms_communes[code_commune]
+    )
+    fig.update_layout(map_center={"lat": lat_commune, "lon": lon_commune})
 
+    evenement = st.plotly_chart(fig, use_container_width=True, on_select="rerun", selection_mode="points", key="carte_zone")
+    afficher_fiche(evenement, positions_zone, df_zone)
@@ -1,16 +1,77 @@
 # %%
-import pandas as pd
 import matplotlib .pyplot as plt
 import seaborn as sns
 import streamlit as st
 import re
 
-data = pd.read_csv('data/pathologie_clean.csv',sep=",")
+from pathologies.accessibilite import POIDS_DEFAUT, indicateurs_acces, score_priorite
+from pathologies.standardisation import (
+    construire_tenseur,
+    population_reference,
+    taux_standardises,
+    taux_standardises_region,
+)
+from pathologies.tendances import classement_hausses, tendances_series, tendances_standardisees
+from donnees.version import version_jeu
+from donnees.selection import selection_region
+from donnees.stockage import charger, regions_disponibles, version_sources
+from donnees.territoires import NOMS_DEPARTEMENTS, REGIONS
+
+@st.cache_data
+def load_pathologies(region):
+    # Ne lit que les partitions de la région sélectionnée ; codes officiels en texte ('09', '2A')
+    df = charger('pathologies', regions=[region])
+    return df.assign(dept=df['dep_code']).drop(columns=['reg_code', 'dep_code'])
+
+
+region = selection_region(regions_disponibles('pathologies'))
+nom_region = REGIONS[region]
+data = load_pathologies(region)
+
+depts_region = sorted(data['dept'].unique())
+dept = st.sidebar.selectbox(
+    "Département",
+    depts_region,
+    index=depts_region.index("31") if "31" in depts_region else 0,
+    format_func=lambda d: NOMS_DEPARTEMENTS.get(d, d),
+    key="dept_pathologies"
+)
+nom_dept = NOMS_DEPARTEMENTS.get(dept, dept)
+
+
+@st.cache_data
+def load_tenseur(data):
+    return construire_tenseur(data)
+
+
+@st.cache_data
+def load_tendances(_tenseur, version, region):
+    # Ajustement de toutes les séries en une passe, recalculé seulement si les données changent
+    return tendances_series(_tenseur), tendances_standardisees(_tenseur, nom_region=REGIONS[region])
+
+
+@st.cache_data
+def load_acces(_tenseur, version, region):
+    # Jointure besoins × offre pour tous les territoires et pathologies, recalculée si les données changent
+    etabs = charger('etablissements', regions=[region],
+                    colonnes=['numero finess etablissement', 'code_insee', 'latitude', 'longitude',
+                              'libelle activite', 'categorie'])
+    communes = charger('distances', regions=[region],
+                       colonnes=['code_insee', 'population', 'latitude_centre', 'longitude_centre',
+                                 'dep_nom', 'epci_code', 'epci_nom'])
+    return indicateurs_acces(_tenseur, etabs, communes)
+
+
+tenseur = load_tenseur(data)
+tendances_ages, tendances_territoires = load_tendances(tenseur, version_jeu('data/pathologie_clean.csv', 'data/partitions/pathologies'), region)
+
 # Création des onglets
-tab1, tab2, tab3 = st.tabs([
-    " Profil épidémiologique de la Haute-Garonne (2023)",
+tab1, tab2, tab3, tab4, tab5 = st.tabs([
+    f" Profil épidémiologique : {nom_dept} (2023)",
     "Dynamique pluriannuelle des 5 pathologies majeures",
-    "Zoom sur les maladies respiratoire chroniques"
+    "Zoom sur les maladies respiratoire chroniques",
+    "Comparaison départementale (taux standardisés)",
+    "Besoins de soins et offre"
 ])
 
 #st.title("Dashboard sur l'état de Santé dans le Département 31")
@@ -28,11 +89,10 @@ data_soins=["Affections de longue durée (dont 31 et 32) pour d'autres causes",
                 'Traitements psychotropes (hors pathologies)','Traitements du risque vasculaire (hors pathologies)',
                 'Hospitalisation pour Covid-19','Maternité (avec ou sans pathologies)']
 # Filtrage de base pour le 31 et hors_patho
-data_patho = data[~data['patho_niv1'].str.contains('|'.join(re.escape(x) for x in hors_patho), case=False, na=False, regex=True)]
+data_patho = data[~data['patho_niv1'].str.contains('|'.join(re.escape(x) for x in hors_patho), case=False, regex=True)]
 
-# Filtrer pour le département 31, l'année 2023 et la population globale
-df_31= data_patho[(data_patho['dept'] == 31)]
-df_66= data_patho[(data_patho['dept'] == 66)]
+# Filtrer pour le département sélectionné, l'année 2023 et la population globale
+df_31= data_patho[(data_patho['dept'] == dept)]
 df_31_2023 = df_31[
                 (df_31['annee'] == 2023)]
 # 2. Exclure 'tous âges' pour ne pas fausser la comparaison entre les tranches spécifiques
@@ -44,7 +104,7 @@ df_31_2023 = df_respi_ages.sort_values(by='prev_calculee',ascending=False)
 
 
 with tab1:
-    st.subheader("Fréquence des pathologies en Haute-Garonne (2023) ")
+    st.subheader(f"Fréquence des pathologies : {nom_dept} (2023) ")
 
     fig, ax = plt.subplots(figsize=(10, 6))
 
@@ -80,7 +140,7 @@ patho_cible = "Maladies respiratoires chroniques (hors mucoviscidose)"
 
 df_respi_2023 = df_31[
     (df_31['annee'] == 2023) &  
-    (df_31['patho_niv1'].str.contains('respiratoires chroniques', case=False, na=False))
+    (df_31['patho_niv1'].str.contains('respiratoires chroniques', case=False))
 
 ]
 
@@ -114,7 +174,7 @@ with tab3:
     for i, val in enumerate(df_respi_ages['prev_calculee']):
         ax.text(val, i, f' {val:.2f}%', va='center', fontsize=10)
 
-    ax.set_title(f'Prévalence par âge : {patho_cible}\n(Haute-Garonne - 2023)', fontsize=14)
+    ax.set_title(f'Prévalence par âge : {patho_cible}\n({nom_dept} - 2023)', fontsize=14)
     ax.set_xlabel('Prévalence (%)')
     ax.set_ylabel("Tranche d'âge")
 
@@ -142,12 +202,13 @@ hors_patho = ["Affections de longue durée (dont 31 et 32) pour d'autres causes"
                 'Hospitalisation pour Covid-19','Maternité (avec ou sans pathologies)']
 
 # Filtrage de base pour le 31 et hors_patho
-#data_patho = data[~data['patho_niv1'].str.contains('|'.join(re.escape(x) for x in hors_patho), case=False, na=False, regex=True)]
+#data_patho = data[~data['patho_niv1'].str.contains('|'.join(re.escape(x) for x in hors_patho), case=False, regex=True)]
 
-# Top 5 pour 2023 (en prenant la moyenne sur les âges pour classer)
-top_5_names = (data_patho[data_patho['annee'] == 2023]
-               .groupby('patho_niv1')['prev_calculee']
-               .mean()
+# Top 5 pour 2023 (classement sur le taux régional standardisé sur l'âge)
+taux_region = taux_standardises_region(tenseur, population_reference(tenseur), nom_region)
+top_5_names = (taux_region[(taux_region['annee'] == 2023)
+                           & taux_region['patho_niv1'].isin(data_patho['patho_niv1'].unique())]
+               .set_index('patho_niv1')['taux_standardise']
                .sort_values(ascending=False)
                .head(5).index)
 
@@ -155,7 +216,6 @@ top_5_names = (data_patho[data_patho['annee'] == 2023]
 df_top5_occitanie = data_patho[data_patho['patho_niv1'].isin(top_5_names)]
 
 df_top5_31 = df_31[df_31['patho_niv1'].isin(top_5_names)]
-df_top5_66 = df_66[df_66['patho_niv1'].isin(top_5_names)]
 
 ###visualisation d'evolution sur le dept31
 
@@ -171,7 +231,7 @@ with tab2:
         marker="o",
         ax=ax
     )
-    ax.set_title("Évolution des 5 affections prépondérantes dans le departement (Haut Garonne)")
+    ax.set_title(f"Évolution des 5 affections prépondérantes dans le departement ({nom_dept})")
     ax.set_xlabel("Année")
     ax.set_ylabel("Prévalence calculée")
     ax.set_ylim(0, 10)
@@ -194,7 +254,7 @@ with tab2:
         marker="o",
         ax=ax
     )
-    ax.set_title("Évolution de la prévalence des 5 pathologies les plus fréquentes (occitanie)")
+    ax.set_title(f"Évolution de la prévalence des 5 pathologies les plus fréquentes ({nom_region})")
     ax.set_xlabel("Année")
     ax.set_ylabel("Prévalence calculée")
     ax.set_ylim(0, 10)
@@ -211,5 +271,143 @@ with tab2:
     **Conclusion :**
     --> nécessité de renforcer les actions de prévention, de dépistage et de prise en charge ciblées sur ces pathologies prioritaires au niveau regional et départemental.
     """)
-    
-    
+    st.subheader("Pathologies en plus forte hausse")
+
+    col1, col2 = st.columns(2)
+    territoire = col1.selectbox(
+        "Territoire",
+        [nom_region] + [str(d) for d in tenseur.depts],
+        key="territoire_tendances"
+    )
+    if territoire == nom_region:
+        # Pas de série par classe d'âge pour la région : seul le taux standardisé est proposé
+        classe_age = col2.selectbox(
+            "Classe d'âge",
+            ["Tous âges (standardisé)"],
+            disabled=True,
+            help="Les tendances par classe d'âge sont disponibles par département.",
+            key="classe_age_tendances_region"
+        )
+    else:
+        classe_age = col2.selectbox(
+            "Classe d'âge",
+            ["Tous âges (standardisé)"] + list(tenseur.classes_age),
+            key="classe_age_tendances"
+        )
+
+    pathologies_suivies = data_patho['patho_niv1'].unique()
+    if classe_age == "Tous âges (standardisé)":
+        classement = classement_hausses(tendances_territoires, territoire, pathologies=pathologies_suivies)
+    else:
+        classement = classement_hausses(
+            tendances_ages[tendances_ages['libelle_classe_age'] == classe_age],
+            territoire,
+            pathologies=pathologies_suivies
+        )
+
+    st.dataframe(
+        classement[['patho_niv1', 'croissance_annuelle', 'pente', 'derniere_valeur', 'projection']]
+        .rename(columns={
+            'patho_niv1': 'Pathologie',
+            'croissance_annuelle': 'Croissance annuelle (%)',
+            'pente': 'Pente (points de % par an)',
+            'derniere_valeur': f'Prévalence {tenseur.annees.max()} (%)',
+            'projection': f'Projection {tenseur.annees.max() + 2} (%)',
+        })
+        .round(2),
+        use_container_width=True,
+        hide_index=True
+    )
+    st.caption("Tendances estimées par moindres carrés sur 2015-2023 ; la croissance annuelle provient d'un ajustement log-linéaire. "
+               "Pour la région, le classement porte sur les taux standardisés sur l'âge.")
+
+
+
+###################comparaison des départements sur les taux standardisés sur l'âge###########################
+
+with tab4:
+    st.subheader("Prévalences standardisées sur l'âge par département")
+
+    col1, col2 = st.columns(2)
+    annee_std = col1.selectbox("Année", sorted(tenseur.annees, reverse=True), key="annee_std")
+    choix_ref = col2.selectbox(
+        "Population de référence",
+        [nom_region] + [f"Département {d}" for d in tenseur.depts],
+        key="population_ref"
+    )
+    dept_ref = None if choix_ref == nom_region else choix_ref.split()[-1]
+
+    # Changer de référence ne relance qu'un produit pondéré sur l'axe des âges
+    reference = population_reference(tenseur, annee=annee_std, dept=dept_ref)
+    df_std = taux_standardises(tenseur, reference)
+    df_std = df_std[(df_std['annee'] == annee_std) & df_std['patho_niv1'].isin(data_patho['patho_niv1'].unique())]
+
+    heatmap = df_std.pivot(index='patho_niv1', columns='dept', values='taux_standardise')
+
+    fig, ax = plt.subplots(figsize=(14, 7))
+    sns.heatmap(heatmap, annot=True, fmt=".1f", cmap="Reds", cbar_kws={'label': 'Prévalence standardisée (%)'}, ax=ax)
+    ax.set_xlabel("Département")
+    ax.set_ylabel("Pathologies")
+    plt.tight_layout()
+    st.pyplot(fig, use_container_width=True)
+
+    st.dataframe(
+        df_std.sort_values(['patho_niv1', 'taux_standardise'], ascending=[True, False]),
+        use_container_width=True,
+        hide_index=True
+    )
+    st.caption("Standardisation directe sur les classes d'âge quinquennales ; IC à 95 % par approximation normale. "
+               "Une classe d'âge sans effectif déclaré compte pour 0 cas ; `couverture` est la part de la population "
+               "de référence dont la classe d'âge est renseignée.")
+
+
+###################indice d'accessibilité aux soins rapporté aux besoins###########################
+
+with tab5:
+    st.subheader("Territoires prioritaires : besoins de soins et offre spécialisée")
+
+    acces = load_acces(tenseur, version_sources(), region)
+
+    col1, col2 = st.columns(2)
+    niveau_acces = col1.radio(
+        "Niveau",
+        ["departement", "epci"],
+        format_func={"departement": "Départements", "epci": "EPCI"}.get,
+        horizontal=True,
+        key="niveau_acces"
+    )
+    patho_acces = col2.selectbox("Pathologie", sorted(acces['patho_niv1'].unique()), key="patho_acces")
+
+    col1, col2, col3 = st.columns(3)
+    poids_besoin = col1.slider("Poids du besoin (prévalence)", 0.0, 3.0, POIDS_DEFAUT["besoin"], 0.5, key="poids_besoin")
+    poids_offre = col2.slider("Poids du manque de structures", 0.0, 3.0, POIDS_DEFAUT["offre"], 0.5, key="poids_offre")
+    poids_distance = col3.slider("Poids de l'éloignement", 0.0, 3.0, POIDS_DEFAUT["distance"], 0.5, key="poids_distance")
+
+    if poids_besoin + poids_offre + poids_distance == 0:
+        st.warning("Au moins un poids doit être positif.")
+    else:
+        # Seule la pondération des rangs déjà calculés est refaite à chaque changement
+        df_acces = score_priorite(
+            acces[(acces['niveau'] == niveau_acces) & (acces['patho_niv1'] == patho_acces)],
+            poids_besoin, poids_offre, poids_distance
+        ).sort_values('score_priorite', ascending=False)
+
+        top_acces = df_acces.head(15)
+        fig, ax = plt.subplots(figsize=(12, 6))
+        sns.barplot(data=top_acces, x='score_priorite', y='territoire', color="#c0392b", ax=ax)
+        ax.set_xlabel("Score de priorité (0-100)")
+        ax.set_ylabel("")
+        ax.set_xlim(0, 100)
+        plt.tight_layout()
+        st.pyplot(fig, use_container_width=True)
+
+        st.dataframe(
+            df_acces[['territoire', 'score_priorite', 'prevalence_std', 'patients_estimes',
+                      'nb_structures', 'structures_100k', 'distance_moyenne_km', 'population']].round(2),
+            use_container_width=True,
+            hide_index=True
+        )
+    st.caption("Besoin : prévalence standardisée sur l'âge du département (dernière année), pondérée par la population "
+               "des communes pour les EPCI. Offre : structures FINESS dont une activité correspond à la pathologie, "
+               "pour 100 000 habitants, et distance moyenne des communes à la plus proche. Le score combine les rangs "
+               "centiles de ces trois indicateurs au sein de la région.")
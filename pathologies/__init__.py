@@ -0,0 +1 @@
+"""Pathologies : calculs vectorisés sur les effectifs par département et âge."""
@@ -0,0 +1,216 @@
+"""
+Indice d'accessibilité aux soins rapporté aux besoins.
+
+Pour chaque territoire (département, EPCI) et chaque pathologie, le besoin
+(prévalence standardisée du département) est mis en regard de l'offre
+spécialisée correspondante dans le fichier FINESS : nombre de structures pour
+100 000 habitants et distance moyenne, pondérée par la population, de chaque
+commune à la structure la plus proche.
+
+Les indicateurs sont calculés une fois pour toutes les paires territoire ×
+pathologie, puis classés en rangs centiles au sein de chaque pathologie. Le
+score de priorité n'est qu'une combinaison linéaire de ces rangs : changer
+les poids ne relance aucun calcul lourd.
+"""
+
+import numpy as np
+import pandas as pd
+
+from donnees.territoires import code_departement
+from etablissement.spatial import haversine_km
+from pathologies.standardisation import population_reference, taux_standardises
+
+
+# Offre de soins correspondant à chaque pathologie : valeurs FINESS par colonne
+OFFRE_PAR_PATHOLOGIE = {
+    "Maladies respiratoires chroniques (hors mucoviscidose)": {
+        "libelle activite": [
+            "Soins de suite et de réadaptation spécialisés - Affections respiratoires",
+            "Greffe de poumon",
+        ],
+        "categorie": ["Structure Dispensatrice à domicile d'Oxygène à usage médical"],
+    },
+    "Insuffisance rénale chronique terminale": {
+        "libelle activite": [
+            "Traitement de l'insuffisance rénale chronique par épuration extrarénale",
+            "Greffe de rein",
+            "Greffe rein-pancréas",
+        ],
+        "categorie": ["Structure d'Alternative à la dialyse en centre"],
+    },
+    "Cancers": {
+        "libelle activite": ["Traitement du cancer", "Greffe de cellules hématopoïétiques allogreffe"],
+    },
+    "Maladies cardioneurovasculaires": {
+        "libelle activite": [
+            "Activités interventionnelles sous imagerie médicale, par voie endovasculaire, en cardiologie",
+            "Activités interventionnelles sous imagerie médicale, par voie endovasculaire, en neuroradiologie",
+            "Chirurgie cardiaque",
+            "Greffe de coeur",
+            "Soins de suite et de réadaptation spécialisés - Affections cardio-vasculaires",
+        ],
+    },
+    "Maladies neurologiques": {
+        "libelle activite": [
+            "Neurochirurgie",
+            "Activités interventionnelles sous imagerie médicale, par voie endovasculaire, en neuroradiologie",
+        ],
+    },
+    "Maladies psychiatriques": {
+        "libelle activite": ["Psychiatrie"],
+        "categorie": [
+            "Centre Médico-Psychologique (C.M.P.)",
+            "Centre Médico-Psycho-Pédagogique (C.M.P.P.)",
+            "Centre Hospitalier Spécialisé lutte Maladies Mentales",
+        ],
+    },
+    "Maladies du foie ou du pancréas (hors mucoviscidose)": {
+        "libelle activite": ["Greffe de foie", "Greffe rein-pancréas"],
+    },
+    "Diabète": {
+        "libelle activite": ["Médecine"],
+        "categorie": ["Maison de santé (L.6223-3)", "Centre de Santé"],
+    },
+}
+
+NIVEAUX = {
+    "departement": ("dep_code", "dep_nom"),
+    "epci": ("epci_code", "epci_nom"),
+}
+
+POIDS_DEFAUT = {"besoin": 1.0, "offre": 1.0, "distance": 1.0}
+
+TAILLE_BLOC = 1000  # communes par bloc de la matrice de distances
+
+
+def structures_par_pathologie(etabs, offre=OFFRE_PAR_PATHOLOGIE):
+    """
+    Une ligne par structure (numéro FINESS) avec ses coordonnées et, pour
+    chaque pathologie, un booléen indiquant si l'une de ses activités y répond.
+    """
+    pathologies = list(offre)
+    masque = pd.DataFrame(
+        {p: np.logical_or.reduce([etabs[col].isin(valeurs).to_numpy() for col, valeurs in offre[p].items()])
+         for p in pathologies},
+        index=etabs.index,
+    )
+    cles = etabs["numero finess etablissement"]
+    structures = (
+        etabs[["numero finess etablissement", "code_insee", "latitude", "longitude"]]
+        .drop_duplicates("numero finess etablissement")
+        .set_index("numero finess etablissement")
+    )
+    structures = structures.join(masque.groupby(cles).any())
+    return structures[structures[pathologies].any(axis=1)], pathologies
+
+
+def distance_plus_proche(communes, structures, pathologies, taille_bloc=TAILLE_BLOC):
+    """Distance (km) de chaque commune à la structure la plus proche, par pathologie : (C, P)."""
+    lat_c = communes["latitude_centre"].to_numpy(dtype=float)[:, None]
+    lon_c = communes["longitude_centre"].to_numpy(dtype=float)[:, None]
+    structures = structures.dropna(subset=["latitude", "longitude"])
+    lat_s = structures["latitude"].to_numpy()[None, :]
+    lon_s = structures["longitude"].to_numpy()[None, :]
+    masque = structures[pathologies].to_numpy()
+
+    distances = np.full((len(communes), len(pathologies)), np.nan)
+    for debut in range(0, len(communes), taille_bloc):
+        bloc = slice(debut, debut + taille_bloc)
+        d = haversine_km(lat_c[bloc], lon_c[bloc], lat_s, lon_s)
+        for j in range(len(pathologies)):
+            if masque[:, j].any():
+                distances[bloc, j] = d[:, masque[:, j]].min(axis=1)
+    return distances
+
+
+def indicateurs_acces(tenseur, etabs, communes, annee=None, offre=OFFRE_PAR_PATHOLOGIE):
+    """
+    Besoin et offre pour toutes les paires territoire × pathologie.
+
+    `communes` fournit, par commune, la population, les coordonnées du centre
+    et les codes / noms de département et d'EPCI (jeu `distances`). Renvoie une
+    ligne par (niveau, territoire, pathologie) avec les rangs centiles servant
+    au score de priorité.
+    """
+    # Besoin : prévalence standardisée du département (structure d'âge régionale)
+    taux = taux_standardises(tenseur, population_reference(tenseur, annee=annee))
+    taux = taux[taux["annee"] == (tenseur.annees.max() if annee is None else annee)]
+    taux = taux.assign(dep_code=code_departement(taux["dept"]).to_numpy())
+
+    structures, pathologies = structures_par_pathologie(etabs, offre)
+    pathologies = [p for p in pathologies if p in set(taux["patho_niv1"])]
+
+    communes = communes.dropna(subset=["latitude_centre", "longitude_centre"]).assign(
+        population=communes["population"].astype(float),
+    ).reset_index(drop=True)
+
+    distances = distance_plus_proche(communes, structures, pathologies)
+    nb_structures = (
+        structures.groupby("code_insee")[pathologies].sum()
+        .reindex(communes["code_insee"], fill_value=0)
+        .to_numpy(dtype=float)
+    )
+    prevalence = (
+        taux.pivot(index="dep_code", columns="patho_niv1", values="taux_standardise")
+        .reindex(index=communes["dep_code"], columns=pathologies)
+        .to_numpy()
+    )
+
+    # Table longue commune × pathologie, agrégée ensuite à chaque niveau
+    c, p = len(communes), len(pathologies)
+    population = np.repeat(communes["population"].to_numpy(), p)
+    longue = pd.DataFrame({
+        "patho_niv1": np.tile(pathologies, c),
+        "population": population,
+        "pop_distance": population * distances.ravel(),
+        "pop_prevalence": population * prevalence.ravel(),
+        "nb_structures": nb_structures.ravel(),
+    })
+
+    resultats = []
+    for niveau, (code, nom) in NIVEAUX.items():
+        if code not in communes.columns:
+            continue
+        longue["code"] = np.repeat(communes[code].astype(str).str.removesuffix(".0").to_numpy(), p)
+        longue["territoire"] = np.repeat(communes[nom].to_numpy(), p)
+        agrege = (
+            longue.groupby(["code", "territoire", "patho_niv1"], sort=False)
+                  [["population", "pop_distance", "pop_prevalence", "nb_structures"]]
+                  .sum()
+                  .reset_index()
+        )
+        resultats.append(agrege.assign(niveau=niveau))
+
+    res = pd.concat(resultats, ignore_index=True)
+    population = res["population"].where(res["population"] > 0)
+    res["prevalence_std"] = res.pop("pop_prevalence") / population
+    res["distance_moyenne_km"] = res.pop("pop_distance") / population
+    res["structures_100k"] = res["nb_structures"] / population * 1e5
+    res["patients_estimes"] = res["prevalence_std"] / 100 * res["population"]
+
+    # Rangs centiles au sein de chaque niveau × pathologie : 1 = situation la plus défavorable
+    groupes = res.groupby(["niveau", "patho_niv1"])
+    res["rang_besoin"] = groupes["prevalence_std"].rank(pct=True)
+    res["rang_offre"] = groupes["structures_100k"].rank(pct=True, ascending=False)
+    res["rang_distance"] = groupes["distance_moyenne_km"].rank(pct=True)
+
+    colonnes = ["niveau", "code", "territoire", "patho_niv1", "population", "prevalence_std", "patients_estimes",
+                "nb_structures", "structures_100k", "distance_moyenne_km", "rang_besoin", "rang_offre", "rang_distance"]
+    return res[colonnes]
+
+
+def score_priorite(indicateurs, besoin=1.0, offre=1.0, distance=1.0):
+    """
+    Score de priorité (0-100) : moyenne pondérée des rangs de besoin, de
+    manque d'offre et d'éloignement. Plus il est élevé, plus le territoire
+    cumule besoin élevé et offre faible ou lointaine.
+    """
+    total = besoin + offre + distance
+    if total <= 0:
+        raise ValueError("Au moins un poids doit être positif.")
+    score = (
+        besoin * indicateurs["rang_besoin"]
+        + offre * indicateurs["rang_offre"]
+        + distance * indicateurs["rang_distance"].fillna(1.0)
+    ) / total
+    return indicateurs.assign(score_priorite=(100 * score).round(1))
@@ -0,0 +1,129 @@
+"""
+Standardisation directe sur l'âge des prévalences de pathologies.
+
+Les effectifs `Ntop` / `Npop` par classe d'âge sont rangés une fois pour
+toutes dans des tableaux NumPy de forme (département, année, pathologie, âge).
+Les taux standardisés et leurs intervalles de confiance sont ensuite calculés
+pour toutes les combinaisons en une seule opération : changer de population
+de référence ne coûte qu'un produit pondéré sur l'axe des âges.
+"""
+
+import re
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+TOUS_AGES = "tous âges"
+Z_95 = 1.959964
+
+
+def ordre_classe_age(libelle):
+    """Borne basse d'une classe d'âge ('de 5 à 9 ans' -> 5, 'plus de 95 ans' -> 95)."""
+    m = re.search(r"\d+", libelle)
+    return int(m.group()) if m else -1
+
+
+@dataclass
+class TenseurPathologies:
+    depts: np.ndarray
+    annees: np.ndarray
+    pathologies: np.ndarray
+    classes_age: np.ndarray
+    ntop: np.ndarray   # (D, Y, P, A), NaN si la cellule est absente
+    npop: np.ndarray   # (D, Y, P, A)
+
+    def population(self):
+        """Population par département, année et classe d'âge : (D, Y, A)."""
+        return np.nan_to_num(np.fmax.reduce(self.npop, axis=2))
+
+
+def construire_tenseur(data):
+    """Range le fichier long `pathologie_clean.csv` dans des tableaux denses."""
+    df = data[data["libelle_classe_age"] != TOUS_AGES]
+
+    classes = sorted(df["libelle_classe_age"].unique(), key=ordre_classe_age)
+    d_codes, depts = pd.factorize(df["dept"], sort=True)
+    y_codes, annees = pd.factorize(df["annee"], sort=True)
+    p_codes, pathos = pd.factorize(df["patho_niv1"], sort=True)
+    a_codes = pd.Categorical(df["libelle_classe_age"], categories=classes).codes
+
+    forme = (len(depts), len(annees), len(pathos), len(classes))
+    ntop = np.full(forme, np.nan)
+    npop = np.full(forme, np.nan)
+    ntop[d_codes, y_codes, p_codes, a_codes] = df["Ntop"].to_numpy(dtype=float)
+    npop[d_codes, y_codes, p_codes, a_codes] = df["Npop"].to_numpy(dtype=float)
+
+    return TenseurPathologies(
+        np.asarray(depts), np.asarray(annees), np.asarray(pathos), np.asarray(classes), ntop, npop
+    )
+
+
+def population_reference(tenseur, annee=None, dept=None):
+    """
+    Structure d'âge de référence (effectifs par classe d'âge).
+
+    Par défaut : la région entière (somme des départements) pour la dernière
+    année disponible. `dept` restreint la référence à un département.
+    """
+    pop = tenseur.population()
+    y = -1 if annee is None else int(np.flatnonzero(tenseur.annees == annee)[0])
+    if dept is None:
+        return pop[:, y, :].sum(axis=0)
+    d = int(np.flatnonzero(tenseur.depts == dept)[0])
+    return pop[d, y, :]
+
+
+def taux_standardises(tenseur, reference):
+    """
+    Taux bruts et standardisés (en %) avec IC à 95 % pour toutes les
+    combinaisons département × année × pathologie.
+
+    Une classe d'âge absente d'une combinaison (aucun cas déclaré, comme la
+    maternité après 50 ans) compte pour un taux nul : les poids ne sont pas
+    renormalisés sur les classes présentes, ce qui surestimerait le taux.
+    `couverture` donne la part de la population de référence dont la classe
+    est effectivement renseignée.
+    """
+    poids = np.asarray(reference, dtype=float)
+    poids = poids / poids.sum()
+
+    renseigne = ~np.isnan(tenseur.ntop) & (np.nan_to_num(tenseur.npop) > 0)
+    ntop = np.where(renseigne, tenseur.ntop, 0.0)
+    npop = np.where(renseigne, tenseur.npop, 1.0)
+    taux = ntop / npop
+
+    std = np.einsum("...a,...a->...", poids, taux)
+    variance = np.einsum("...a,...a->...", poids ** 2, ntop / npop ** 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        brut = ntop.sum(axis=-1) / np.where(renseigne, npop, 0.0).sum(axis=-1)
+    couverture = np.where(renseigne, poids, 0.0).sum(axis=-1)
+
+    erreur = Z_95 * np.sqrt(variance)
+
+    index = pd.MultiIndex.from_product(
+        [tenseur.depts, tenseur.annees, tenseur.pathologies],
+        names=["dept", "annee", "patho_niv1"],
+    )
+    res = pd.DataFrame({
+        "taux_brut": 100 * brut.ravel(),
+        "taux_standardise": 100 * std.ravel(),
+        "ic_bas": 100 * np.clip(std - erreur, 0, None).ravel(),
+        "ic_haut": 100 * (std + erreur).ravel(),
+        "couverture": couverture.ravel(),
+    }, index=index)
+    # Combinaisons sans aucune classe renseignée : pathologie absente du département cette année-là
+    return res[renseigne.any(axis=-1).ravel()].reset_index()
+
+
+def taux_standardises_region(tenseur, reference, nom_region="Occitanie"):
+    """Mêmes taux pour la région entière (effectifs sommés sur les départements)."""
+    ntop = np.nansum(tenseur.ntop, axis=0, keepdims=True)
+    npop = np.nansum(np.where(np.isnan(tenseur.ntop), np.nan, tenseur.npop), axis=0, keepdims=True)
+    present = np.any(~np.isnan(tenseur.ntop), axis=0, keepdims=True)
+    region = TenseurPathologies(
+        np.array([nom_region]), tenseur.annees, tenseur.pathologies, tenseur.classes_age,
+        np.where(present, ntop, np.nan), np.where(present, npop, np.nan),
+    )
+    return taux_standardises(region, reference)
@@ -0,0 +1,113 @@
+"""
+Estimation groupée des tendances des séries de prévalence (2015-2023).
+
+Toutes les séries (département × classe d'âge × pathologie) sont ajustées en
+même temps : les moindres carrés sont écrits sous forme matricielle sur un
+tableau (séries × années), les années manquantes étant simplement masquées.
+"""
+
+import numpy as np
+import pandas as pd
+
+from pathologies.standardisation import (
+    population_reference,
+    taux_standardises,
+    taux_standardises_region,
+)
+
+
+def ajuster_tendances(valeurs, annees, horizon=2):
+    """
+    Ajuste une droite et une croissance exponentielle à chaque ligne de
+    `valeurs` (forme séries × années, NaN = année absente).
+
+    Retourne un dict de tableaux : pente (unités par an), croissance annuelle
+    (en %, ajustement log-linéaire), dernière valeur et projection à
+    `horizon` ans après la dernière année.
+    """
+    y = np.asarray(valeurs, dtype=float)
+    t = np.asarray(annees, dtype=float)[None, :]
+    masque = ~np.isnan(y)
+    n = masque.sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t_moy = np.where(masque, t, 0).sum(axis=1) / n
+        y_moy = np.where(masque, y, 0).sum(axis=1) / n
+        dt = np.where(masque, t - t_moy[:, None], 0)
+        dy = np.where(masque, y - y_moy[:, None], 0)
+        sxx = (dt ** 2).sum(axis=1)
+        pente = (dt * dy).sum(axis=1) / sxx
+        ordonnee = y_moy - pente * t_moy
+
+        # Croissance : même ajustement sur log(y), valeurs strictement positives
+        masque_log = masque & (np.nan_to_num(y) > 0)
+        n_log = masque_log.sum(axis=1)
+        log_y = np.log(np.where(masque_log, y, 1.0))
+        t_moy_log = np.where(masque_log, t, 0).sum(axis=1) / n_log
+        l_moy = np.where(masque_log, log_y, 0).sum(axis=1) / n_log
+        dt_log = np.where(masque_log, t - t_moy_log[:, None], 0)
+        dl = np.where(masque_log, log_y - l_moy[:, None], 0)
+        pente_log = (dt_log * dl).sum(axis=1) / (dt_log ** 2).sum(axis=1)
+
+    # Dernière valeur observée de chaque série
+    dernier = masque.shape[1] - 1 - np.argmax(masque[:, ::-1], axis=1)
+    derniere_valeur = np.where(n > 0, y[np.arange(len(y)), dernier], np.nan)
+
+    annee_cible = t.max() + horizon
+    fiable = n >= 3
+    return {
+        "n_points": n,
+        "pente": np.where(fiable, pente, np.nan),
+        "croissance_annuelle": np.where(fiable & (n_log >= 3), 100 * np.expm1(pente_log), np.nan),
+        "derniere_valeur": derniere_valeur,
+        "projection": np.where(fiable, np.clip(ordonnee + pente * annee_cible, 0, None), np.nan),
+    }
+
+
+def tendances_series(tenseur, horizon=2):
+    """Tendances de toutes les séries département × pathologie × classe d'âge (en %)."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        taux = 100 * tenseur.ntop / tenseur.npop          # (D, Y, P, A)
+    series = np.moveaxis(taux, 1, -1)                     # (D, P, A, Y)
+    Y = series.shape[-1]
+
+    fit = ajuster_tendances(series.reshape(-1, Y), tenseur.annees, horizon)
+
+    index = pd.MultiIndex.from_product(
+        [tenseur.depts, tenseur.pathologies, tenseur.classes_age],
+        names=["dept", "patho_niv1", "libelle_classe_age"],
+    )
+    res = pd.DataFrame(fit, index=index)
+    return res[res["n_points"] > 0].reset_index()
+
+
+def tendances_standardisees(tenseur, reference=None, horizon=2, nom_region="Occitanie"):
+    """
+    Tendances des taux standardisés sur l'âge, par département et pour la
+    région (somme des départements), toutes pathologies confondues.
+    """
+    if reference is None:
+        reference = population_reference(tenseur)
+
+    taux = taux_standardises(tenseur, reference)
+    region = taux_standardises_region(tenseur, reference, nom_region)
+    taux = pd.concat([taux.astype({"dept": str}), region], ignore_index=True)
+
+    grille = taux.pivot_table(
+        index=["dept", "patho_niv1"], columns="annee", values="taux_standardise"
+    )
+    fit = ajuster_tendances(grille.to_numpy(), grille.columns.to_numpy(), horizon)
+    return pd.DataFrame(fit, index=grille.index).reset_index()
+
+
+def classement_hausses(tendances, territoire, n=10, pathologies=None):
+    """Pathologies en plus forte hausse (croissance annuelle) pour un territoire."""
+    df = tendances[tendances["dept"].astype(str) == str(territoire)]
+    if pathologies is not None:
+        df = df[df["patho_niv1"].isin(pathologies)]
+    return (
+        df.dropna(subset=["croissance_annuelle"])
+          .sort_values("croissance_annuelle", ascending=False)
+          .head(n)
+          .reset_index(drop=True)
+    )
@@ -0,0 +1 @@
+"""Indicateurs socio-économiques des IRIS : comparaisons QPV / hors QPV."""
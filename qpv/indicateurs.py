@@ -0,0 +1,115 @@
+"""
+Moteur d'indicateurs IRIS pour les comparaisons QPV / hors QPV.
+
+Le moteur travaille sur une table IRIS colonnaire, sans géométrie, couvrant
+toute l'Occitanie. Médianes, quantiles et ratios QPV / hors QPV sont calculés
+pour plusieurs variables à la fois, par commune, EPCI ou pour toute la région,
+en un seul groupby vectorisé.
+"""
+
+import pandas as pd
+
+
+# Colonnes de regroupement disponibles pour chaque niveau territorial
+NIVEAUX = {
+    "region": [],
+    "epci": ["epci_code", "epci_nom"],
+    "commune": ["code_insee", "nom_commune"],
+}
+
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+def table_iris(iris, communes=None):
+    """
+    Construit la table IRIS colonnaire (sans géométrie) à partir du
+    GeoDataFrame chargé par les pages.
+
+    `communes` (optionnel) : référentiel des communes (code_insee, epci_code,
+    epci_nom) utilisé pour rattacher chaque IRIS à son EPCI.
+    """
+    df = pd.DataFrame(iris.drop(columns="geometry", errors="ignore"))
+
+    # Harmonisation des noms de colonnes IGN / INSEE
+    df = df.rename(columns={"INSEE_COM": "code_insee", "NOM_COM": "nom_commune"})
+    if "code_insee" in df.columns:
+        df["code_insee"] = df["code_insee"].astype(str).str.zfill(5)
+
+    if communes is not None and "code_insee" in df.columns and "epci_code" not in df.columns:
+        ref = communes[["code_insee", "epci_code", "epci_nom"]].drop_duplicates("code_insee").copy()
+        ref["code_insee"] = ref["code_insee"].astype(str).str.zfill(5)
+        df = df.merge(ref, on="code_insee", how="left")
+
+    df["is_qpv"] = df["is_qpv"].fillna(0).astype("int8")
+
+    # Clés de regroupement en catégories : groupby plus rapide et table plus légère
+    for col in ("code_insee", "nom_commune", "epci_code", "epci_nom"):
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    return df
+
+
+def _regrouper(iris, niveau, nom_region):
+    """Table et colonnes de regroupement du niveau ; erreur si la table ne les porte pas."""
+    if niveau not in NIVEAUX:
+        raise ValueError(f"Niveau inconnu : {niveau} (attendu : {', '.join(NIVEAUX)}).")
+    if not NIVEAUX[niveau]:
+        return iris.assign(territoire=nom_region), ["territoire"]
+    manquantes = [c for c in NIVEAUX[niveau] if c not in iris.columns]
+    if manquantes:
+        raise ValueError(
+            f"Niveau '{niveau}' indisponible : colonnes absentes de la table IRIS ({', '.join(manquantes)})."
+        )
+    return iris, NIVEAUX[niveau]
+
+
+def calculer_indicateurs(iris, variables, niveau="region", quantiles=QUANTILES, nom_region="Occitanie"):
+    """
+    Calcule, pour chaque territoire du niveau demandé et chaque variable :
+    nombre d'IRIS, quantiles QPV / hors QPV, écart et ratio des médianes.
+
+    Retourne un DataFrame à colonnes à plat, une ligne par territoire,
+    p. ex. `revenu_median_q50_qpv`, `revenu_median_ratio`. Lève ValueError si
+    la table ne porte pas les colonnes du niveau (EPCI sans `communes`).
+    """
+    variables = list(variables)
+    iris, cles = _regrouper(iris, niveau, nom_region)
+    if 0.5 not in quantiles:
+        quantiles = tuple(sorted(set(quantiles) | {0.5}))
+
+    # Un seul passage : tous les quantiles de toutes les variables, par groupe
+    groupes = iris.groupby(cles + ["is_qpv"], observed=True, sort=False)
+    q = groupes[variables].quantile(list(quantiles)).unstack(-1)
+    q = q.unstack("is_qpv")
+    q.columns = [
+        f"{var}_q{round(qt * 100):02d}_{'qpv' if flag == 1 else 'hors'}"
+        for var, qt, flag in q.columns
+    ]
+
+    n = groupes.size().unstack("is_qpv", fill_value=0)
+    res = pd.DataFrame({
+        "nb_iris": n.sum(axis=1),
+        "nb_qpv": n.get(1, 0),
+    }).join(q)
+
+    for var in variables:
+        med_qpv = res.get(f"{var}_q50_qpv")
+        med_hors = res.get(f"{var}_q50_hors")
+        if med_qpv is None or med_hors is None:
+            continue
+        res[f"{var}_ecart"] = med_hors - med_qpv
+        res[f"{var}_ratio"] = (med_qpv / med_hors.where(med_hors > 0)).round(2)
+
+    return res.reset_index()
+
+
+def territoires_avec_qpv(iris, niveau="commune", nom_region="Occitanie"):
+    """Liste des territoires du niveau donné comptant au moins un IRIS QPV."""
+    iris, cles = _regrouper(iris, niveau, nom_region)
+    return (
+        iris.loc[iris["is_qpv"] == 1, cles]
+        .drop_duplicates()
+        .sort_values(cles[-1])
+        .reset_index(drop=True)
+    )
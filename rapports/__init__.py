@@ -0,0 +1 @@
+"""Génération hors ligne des diagnostics territoriaux par EPCI."""
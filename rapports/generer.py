@@ -0,0 +1,288 @@
+"""
+Génération en lot des diagnostics territoriaux, un fichier par EPCI.
+
+Chaque rapport reprend les sections du tableau de bord (établissements,
+distance aux urgences, pathologies du département) dans un fichier HTML
+autonome, graphiques compris. Les rapports sont produits par un pool de
+processus : les jeux de données sont chargés une seule fois par processus,
+les graphiques sont rendus en PNG statiques avec matplotlib.
+
+Usage :
+    python -m rapports.generer                       # tous les EPCI de la région
+    python -m rapports.generer --epci 243100518 200067940 --format pdf
+"""
+
+import argparse
+import base64
+import html
+import io
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from pathlib import Path
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from donnees.stockage import charger
+from donnees.territoires import NOMS_DEPARTEMENTS, REGION_DEFAUT, REGIONS
+from pathologies.standardisation import (
+    construire_tenseur,
+    population_reference,
+    taux_standardises,
+    taux_standardises_region,
+)
+
+
+DOSSIER_SORTIE = Path("rapports_generes")
+
+HORS_PATHO = (
+    "Affections de longue durée (dont 31 et 32) pour d'autres causes",
+    "Hospitalisations hors pathologies repérées (avec ou sans pathologies, traitements ou maternité)",
+    "Traitements antalgiques ou anti-inflammatoires (hors pathologies, traitements, maternité ou hospitalisations)",
+    "Traitements psychotropes (hors pathologies)",
+    "Traitements du risque vasculaire (hors pathologies)",
+    "Hospitalisation pour Covid-19",
+    "Maternité (avec ou sans pathologies)",
+)
+
+# Jeux de données partagés, chargés une fois par processus
+_DONNEES = {}
+
+
+def charger_donnees(region):
+    """Initialisation d'un processus : chargement des jeux de la région."""
+    communes = charger("distances", regions=[region])
+    etabs = charger("etablissements", regions=[region]).merge(
+        communes[["code_insee", "nom_standard", "epci_code"]], on="code_insee", how="left"
+    )
+
+    # Codes départementaux officiels ('09', '2A'), comme `dep_code` des communes
+    pathologies = charger("pathologies", regions=[region])
+    tenseur = construire_tenseur(pathologies.assign(dept=pathologies["dep_code"]))
+    reference = population_reference(tenseur)
+    taux = taux_standardises(tenseur, reference)
+    taux_region = taux_standardises_region(tenseur, reference, REGIONS[region])
+    annee = tenseur.annees.max()
+
+    _DONNEES.update(
+        region=region,
+        communes=communes,
+        etablissements=etabs,
+        pathologies=taux[(taux["annee"] == annee) & ~taux["patho_niv1"].isin(HORS_PATHO)],
+        pathologies_region=taux_region[(taux_region["annee"] == annee) & ~taux_region["patho_niv1"].isin(HORS_PATHO)],
+        annee=annee,
+    )
+
+
+def liste_epci(region=REGION_DEFAUT):
+    communes = charger("distances", regions=[region], colonnes=["epci_code", "epci_nom"])
+    return (
+        communes[["epci_code", "epci_nom"]]
+        .dropna()
+        .drop_duplicates("epci_code")
+        .sort_values("epci_nom")
+        .reset_index(drop=True)
+    )
+
+
+# ─── RENDU ───────────────────────────────────────────────────────
+def _image(fig):
+    tampon = io.BytesIO()
+    # Mise en page "constrained" à la création : pas de second rendu comme avec bbox_inches="tight"
+    fig.savefig(tampon, format="png", dpi=110)
+    plt.close(fig)
+    return f'<img src="data:image/png;base64,{base64.b64encode(tampon.getvalue()).decode()}">'
+
+
+def _tableau(df):
+    return df.to_html(index=False, border=0, classes="tableau", float_format=lambda x: f"{x:,.2f}")
+
+
+def _section_etablissements(etabs, communes):
+    total = etabs["numero finess etablissement"].nunique()
+    population = communes["population"].sum()
+    typo = (
+        etabs.groupby("type d etablissements")
+             .agg(nb_etablissements=("numero finess etablissement", "count"))
+             .reset_index()
+             .sort_values("nb_etablissements", ascending=False)
+    )
+    typo["pourcentage"] = (typo["nb_etablissements"] / max(total, 1) * 100).round(2)
+
+    fig, ax = plt.subplots(figsize=(8, 4), layout="constrained")
+    ax.barh(typo["type d etablissements"], typo["nb_etablissements"], color="#3b6ea5")
+    ax.invert_yaxis()
+    ax.set_xlabel("Nombre d'établissements")
+
+    kpis = {
+        "Établissements recensés": f"{total}",
+        "Types d’établissements": f"{typo.shape[0]}",
+        "Communes": f"{communes['code_insee'].nunique()}",
+        "Population": f"{population:,}",
+        "Personnes par établissement": f"{population / total:,.0f}" if total else "N/A",
+    }
+    return "<h2>🏥 Établissements de santé</h2>" + _kpis(kpis) + _tableau(typo) + (_image(fig) if total else "")
+
+
+def _section_distances(communes):
+    moyenne = communes["distance_urgence_km"].mean()
+    plus_loin = communes.sort_values("distance_urgence_km", ascending=False)[
+        ["nom_standard", "grille_densite_texte", "population", "distance_urgence_km"]
+    ].head(10)
+
+    fig, ax = plt.subplots(figsize=(8, 3.5), layout="constrained")
+    ax.hist(communes["distance_urgence_km"].dropna(), bins=20, color="#d9822b")
+    ax.set_xlabel("Distance au service d'urgence le plus proche (km)")
+    ax.set_ylabel("Communes")
+
+    kpis = {
+        "Distance moyenne": f"{moyenne:.1f} km",
+        "Distance maximale": f"{communes['distance_urgence_km'].max():.1f} km",
+    }
+    return ("<h2>🚑 Distance aux urgences</h2>" + _kpis(kpis) + _image(fig)
+            + "<h3>Communes les plus éloignées</h3>" + _tableau(plus_loin))
+
+
+@lru_cache(maxsize=None)
+def _section_pathologies(dept):
+    """Section commune à tous les EPCI d'un même département : rendue une fois par processus."""
+    taux_dept = _DONNEES["pathologies"]
+    taux_dept = taux_dept[taux_dept["dept"] == dept]
+    taux_region = _DONNEES["pathologies_region"]
+    annee = _DONNEES["annee"]
+
+    comparaison = (
+        taux_dept[["patho_niv1", "taux_standardise"]]
+        .merge(taux_region[["patho_niv1", "taux_standardise"]], on="patho_niv1", suffixes=("_dept", "_region"))
+        .sort_values("taux_standardise_dept", ascending=False)
+    )
+
+    fig, ax = plt.subplots(figsize=(8, 4), layout="constrained")
+    y = range(len(comparaison))
+    ax.barh([i + 0.2 for i in y], comparaison["taux_standardise_dept"], height=0.4, label="Département")
+    ax.barh([i - 0.2 for i in y], comparaison["taux_standardise_region"], height=0.4, label="Région")
+    ax.set_yticks(list(y), comparaison["patho_niv1"])
+    ax.invert_yaxis()
+    ax.set_xlabel("Prévalence standardisée sur l'âge (%)")
+    ax.legend()
+
+    nom = NOMS_DEPARTEMENTS.get(dept, dept)
+    return (f"<h2>🤒 Pathologies – {html.escape(nom)} ({annee})</h2>"
+            "<p>Données disponibles à l'échelle du département de rattachement de l'EPCI.</p>"
+            + _image(fig) + _tableau(comparaison.rename(columns={
+                "patho_niv1": "Pathologie",
+                "taux_standardise_dept": "Département (%)",
+                "taux_standardise_region": "Région (%)",
+            })))
+
+
+def _kpis(kpis):
+    cellules = "".join(
+        f'<div class="kpi"><span>{html.escape(k)}</span><strong>{html.escape(v)}</strong></div>'
+        for k, v in kpis.items()
+    )
+    return f'<div class="kpis">{cellules}</div>'
+
+
+STYLE = """
+body { font-family: sans-serif; max-width: 960px; margin: 2em auto; color: #222; }
+.kpis { display: flex; flex-wrap: wrap; gap: 1em; margin: 1em 0; }
+.kpi { border: 1px solid #ddd; border-radius: 6px; padding: .6em 1em; }
+.kpi span { display: block; font-size: .8em; color: #666; }
+.kpi strong { font-size: 1.4em; }
+.tableau { border-collapse: collapse; margin: 1em 0; font-size: .9em; }
+.tableau th, .tableau td { padding: .3em .8em; border-bottom: 1px solid #eee; text-align: left; }
+img { max-width: 100%; }
+"""
+
+
+def rendre_rapport(epci_code):
+    """HTML autonome du diagnostic d'un EPCI."""
+    communes = _DONNEES["communes"]
+    communes = communes[communes["epci_code"] == epci_code]
+    etabs = _DONNEES["etablissements"]
+    etabs = etabs[etabs["epci_code"] == epci_code]
+    nom = communes["epci_nom"].iloc[0]
+
+    # Département de rattachement : celui qui porte le plus de population
+    dept_code = communes.groupby("dep_code")["population"].sum().idxmax()
+
+    corps = (
+        _section_etablissements(etabs, communes)
+        + _section_distances(communes)
+        + _section_pathologies(dept_code)
+    )
+    return f"""<!DOCTYPE html>
+<html lang="fr"><head><meta charset="utf-8">
+<title>Diagnostic santé – {html.escape(nom)}</title><style>{STYLE}</style></head>
+<body><h1>Diagnostic santé – {html.escape(nom)}</h1>
+<p>EPCI {epci_code} · {html.escape(REGIONS[_DONNEES['region']])}</p>
+{corps}
+<hr><p><small>Sources : FINESS, INSEE, Assurance Maladie (cartographie des pathologies).</small></p>
+</body></html>"""
+
+
+def _nom_fichier(epci_code, nom):
+    # Accents retirés avant le remplacement des caractères spéciaux : « Pyrénées » -> « Pyrenees »
+    ascii_ = unicodedata.normalize("NFKD", nom).encode("ascii", "ignore").decode()
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", ascii_).strip("_")
+    return f"{epci_code}_{slug}"
+
+
+def generer_rapport(epci_code, nom, sortie, format_):
+    """Tâche exécutée dans un processus du pool."""
+    contenu = rendre_rapport(epci_code)
+    chemin = Path(sortie) / f"{_nom_fichier(epci_code, nom)}.{format_}"
+    if format_ == "pdf":
+        from weasyprint import HTML  # dépendance optionnelle, uniquement pour le PDF
+
+        HTML(string=contenu).write_pdf(chemin)
+    else:
+        chemin.write_text(contenu, encoding="utf-8")
+    return chemin
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère un diagnostic santé par EPCI.")
+    parser.add_argument("--region", default=REGION_DEFAUT, choices=sorted(REGIONS))
+    parser.add_argument("--epci", nargs="*", help="codes EPCI (par défaut : tous ceux de la région)")
+    parser.add_argument("--sortie", default=str(DOSSIER_SORTIE))
+    parser.add_argument("--format", choices=["html", "pdf"], default="html")
+    parser.add_argument("--processus", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    epcis = liste_epci(args.region)
+    if args.epci:
+        epcis = epcis[epcis["epci_code"].astype(str).isin(args.epci)]
+    Path(args.sortie).mkdir(parents=True, exist_ok=True)
+
+    debut = time.perf_counter()
+    erreurs = 0
+    with ProcessPoolExecutor(
+        max_workers=args.processus, initializer=charger_donnees, initargs=(args.region,)
+    ) as pool:
+        taches = {
+            pool.submit(generer_rapport, row.epci_code, row.epci_nom, args.sortie, args.format): row.epci_nom
+            for row in epcis.itertuples()
+        }
+        for tache in as_completed(taches):
+            try:
+                tache.result()
+            except Exception as e:
+                erreurs += 1
+                print(f"Échec pour {taches[tache]} : {e}")
+    duree = time.perf_counter() - debut
+
+    produits = len(epcis) - erreurs
+    print(f"{produits} rapports générés dans {args.sortie} en {duree:.1f} s "
+          f"({produits / duree:.1f} rapports/s, {args.processus} processus)")
+
+
+if __name__ == "__main__":
+    main()